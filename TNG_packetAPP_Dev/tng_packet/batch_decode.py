@@ -0,0 +1,194 @@
+"""
+Offline MPDA decoder for recordings (no Qt, no sound card).
+
+    python -m tng_packet.batch_decode rec1.wav rec2.wav -j 4 > messages.jsonl
+    python -m tng_packet.batch_decode --auto unknown.wav      (find tracks/speed per message)
+
+Files are streamed in blocks (wave reads / np.memmap), never loaded whole. Long files are split into
+segments decoded in parallel: a segment owns every message whose pilot STARTS inside it, and its worker
+reads past the segment end to finish such a message. One JSON line is printed per decoded message.
+"""
+
+import argparse
+import json
+import sys
+import wave
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from tng_packet.core.mpda_core import MPDAReceiver, SAMPLE_RATE, PILOT_DURATION, GAP_DURATION
+from tng_packet.core.mpda_multi import MPDAAutoReceiver
+
+# Seconds read from disk per block, fed to the receiver in FEED_SECONDS pieces (timestamp resolution)
+READ_SECONDS = 5.0
+FEED_SECONDS = 0.25
+# Default segment length per worker job, and how far a worker reads past its segment for a late pilot
+SEGMENT_SECONDS = 600.0
+LOOKAHEAD_SECONDS = PILOT_DURATION + GAP_DURATION + 1.0
+
+RAW_FORMATS = {'int16': np.int16, 'int32': np.int32, 'float32': np.float32, 'float64': np.float64}
+
+class AudioFile:
+    """
+    Random-access block reader for PCM WAV or headerless raw files; returns the samples of one channel.
+    int16 / int32 / float PCM is returned as stored (the receiver scales integers itself), 8 and 24 bit as float32.
+    """
+    def __init__(self, path, channel=0, raw_format=None, raw_rate=SAMPLE_RATE, raw_channels=1):
+        self.path = path
+        self.channel = channel
+        if raw_format:
+            dtype = np.dtype(RAW_FORMATS[raw_format])
+            self._raw = np.memmap(path, dtype=dtype, mode='r')
+            self.sample_rate = raw_rate
+            self.channels = raw_channels
+            self.frames = len(self._raw) // raw_channels
+            self._wav = None
+        else:
+            self._raw = None
+            self._wav = wave.open(path, 'rb')
+            self.sample_rate = self._wav.getframerate()
+            self.channels = self._wav.getnchannels()
+            self.frames = self._wav.getnframes()
+            self._width = self._wav.getsampwidth()
+        if channel >= self.channels: raise ValueError(f'{path}: no channel {channel} ({self.channels} channels)')
+
+    def read(self, start, n):
+        n = max(min(n, self.frames - start), 0)
+        if self._raw is not None:
+            block = self._raw[start * self.channels:(start + n) * self.channels]
+            return block[self.channel::self.channels]
+        self._wav.setpos(start)
+        data = self._wav.readframes(n)
+        w = self._width
+        if w == 1:
+            x = (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+        elif w == 3:
+            b = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3)
+            x = ((b[:, 0].astype(np.int32) | (b[:, 1].astype(np.int32) << 8) | (b[:, 2].astype(np.int8).astype(np.int32) << 16)) / 8388608.0).astype(np.float32)
+        else:
+            dtype = {2: np.int16, 4: np.int32}[w]
+            x = np.frombuffer(data, dtype=dtype)
+        return x[self.channel::self.channels]
+
+    def close(self):
+        if self._wav is not None: self._wav.close()
+        self._raw = None
+
+def _decode_segment(job):
+    """Worker: decode the messages whose pilot starts in [start, stop) of one file."""
+    path, start, stop, opts = job
+    audio = AudioFile(path, opts['channel'], opts['raw_format'], opts['raw_rate'], opts['raw_channels'])
+    try:
+        rate = audio.sample_rate
+        rx = MPDAAutoReceiver(sample_rate=rate) if opts['auto'] else MPDAReceiver(opts['tracks'], opts['speed'], rate)
+        pilot_offset = int((PILOT_DURATION + GAP_DURATION) * rate)
+        read_len = int(READ_SECONDS * rate)
+        feed_len = int(FEED_SECONDS * rate)
+        limit = stop + int(LOOKAHEAD_SECONDS * rate)
+        messages = []
+        current = None
+        seen_start = None
+        pos = start
+        while pos < audio.frames:
+            # Past the segment (+ lookahead) only keep reading to finish a message already in flight
+            if pos >= limit and current is None and rx.state in ('IDLE', 'SEARCH_PILOT'): break
+            block = audio.read(pos, read_len)
+            for i in range(0, len(block), feed_len):
+                tokens = rx.process_audio(block[i:i+feed_len])
+                if rx.payload_start is not None and rx.payload_start != seen_start:
+                    seen_start = rx.payload_start
+                    if current is not None: messages.append(current)
+                    # Absolute sample where this message's pilot began
+                    pilot_start = start + rx.payload_start - pilot_offset
+                    current = {'file': path, 'start': round(pilot_start / rate, 3), 'end': None,
+                               'text': '', 'complete': False, '_own': start <= pilot_start < stop}
+                for token in tokens:
+                    if current is None: continue
+                    if token == '<EOT>':
+                        current['complete'] = True
+                        # Where the EOT symbol ended, not where this feed left the receiver
+                        current['end'] = round((start + rx.payload_end) / rate, 3)
+                        messages.append(current)
+                        current = None
+                    else:
+                        if not current['text']:
+                            current['encoding'] = rx.encoding
+                            if opts['auto']: current['tracks'], current['speed'] = rx.detected
+                        current['text'] += token
+            pos += len(block)
+            if not len(block): break
+        if current is not None:
+            current['end'] = round((start + rx.buffer.position) / rate, 3)
+            messages.append(current)
+        # A pilot whose SYNC never came (false trigger, lost preamble) leaves no text: nothing to report
+        return [{k: v for k, v in m.items() if k != '_own'} for m in messages if m['_own'] and m['text']]
+    finally:
+        audio.close()
+
+def plan_jobs(paths, opts, segment_seconds=SEGMENT_SECONDS):
+    jobs = []
+    for path in paths:
+        try:
+            audio = AudioFile(path, opts['channel'], opts['raw_format'], opts['raw_rate'], opts['raw_channels'])
+            frames = audio.frames
+            seg = max(int(segment_seconds * audio.sample_rate), 1)
+            audio.close()
+        except (OSError, EOFError, ValueError, wave.Error) as e:
+            jobs.append((path, None, None, str(e)))
+            continue
+        for start in range(0, max(frames, 1), seg):
+            jobs.append((path, start, min(start + seg, frames), opts))
+    return jobs
+
+def _run_job(job):
+    path, start, stop, opts = job
+    if start is None: return [{'file': path, 'error': opts}]
+    return _decode_segment(job)
+
+def decode_files(paths, tracks=4, speed=10, jobs=None, segment_seconds=SEGMENT_SECONDS,
+                 channel=0, raw_format=None, raw_rate=SAMPLE_RATE, raw_channels=1, auto=False):
+    """
+    Yield decoded message dicts in file/time order, decoding segments across a process pool.
+    With auto=True tracks/speed are detected per message and added to its dict.
+    """
+    opts = {'tracks': tracks, 'speed': speed, 'auto': auto, 'channel': channel,
+            'raw_format': raw_format, 'raw_rate': raw_rate, 'raw_channels': raw_channels}
+    work = plan_jobs(paths, opts, segment_seconds)
+    last = {}
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        for results in pool.map(_run_job, work):
+            for msg in results:
+                # A pilot right on a segment boundary can be claimed by both neighbours
+                prev = last.get(msg['file'])
+                if 'start' in msg:
+                    if prev is not None and abs(msg['start'] - prev) < PILOT_DURATION: continue
+                    last[msg['file']] = msg['start']
+                yield msg
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog='python -m tng_packet.batch_decode', description='Decode MPDA messages from recordings to JSON lines.')
+    ap.add_argument('files', nargs='+')
+    ap.add_argument('-t', '--tracks', type=int, default=4, choices=(1, 4, 8))
+    ap.add_argument('-s', '--speed', type=int, default=10)
+    ap.add_argument('--auto', action='store_true', help='detect tracks/speed per message (ignores -t/-s)')
+    ap.add_argument('-j', '--jobs', type=int, default=None, help='worker processes (default: CPU count)')
+    ap.add_argument('--segment', type=float, default=SEGMENT_SECONDS, help='seconds of audio per job')
+    ap.add_argument('--channel', type=int, default=0)
+    ap.add_argument('--raw-format', choices=sorted(RAW_FORMATS), help='treat files as headerless raw samples')
+    ap.add_argument('--raw-rate', type=int, default=SAMPLE_RATE)
+    ap.add_argument('--raw-channels', type=int, default=1)
+    ap.add_argument('-o', '--output', help='write JSON lines here instead of stdout')
+    args = ap.parse_args(argv)
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        for msg in decode_files(args.files, args.tracks, args.speed, args.jobs, args.segment,
+                                args.channel, args.raw_format, args.raw_rate, args.raw_channels, args.auto):
+            out.write(json.dumps(msg, ensure_ascii=False) + '\n')
+            out.flush()
+    finally:
+        if out is not sys.stdout: out.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,296 @@
+"""
+MPDA benchmark: transmitter speed, receiver throughput and link quality (no Qt, no sound card).
+
+    python -m tng_packet.benchmark -o bench.json
+    python -m tng_packet.benchmark --quick -o new.json --compare bench.json
+
+  tx:   generate_signal time and airtime per synthesis dtype x payload encoding x text kind (uniform random
+        characters or QSO-like words) x tracks x speed x message length (best of --repeat)
+  rx:   process_audio throughput per input format x chunk size: samples/s and real-time factor (CPU time / audio time)
+  link: transmitter -> simulated channel (tng_packet.core.channel) -> receiver, character error rate
+        per impairment profile x payload encoding x receiver (fixed: told the tracks and speed, auto:
+        MPDAAutoReceiver) x tracks x SNR, averaged over --trials random messages
+  alloc: spectrum display path (SpectralEngine -> DisplayScaler -> WaterfallBuffer) after warm-up, per FFT size
+        x averaging: net and peak bytes allocated over ALLOC_FRAMES frames (tracemalloc); 'ok' is False above
+        ALLOC_NET_LIMIT / ALLOC_PEAK_LIMIT
+
+Results are written as one JSON document. --compare prints the change of every row found in both
+files and exits with status 1 if anything got worse by more than --tolerance; a failed alloc row
+also exits with status 1.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+
+from tng_packet.core.channel import Channel
+from tng_packet.core.dsp import to_int16
+from tng_packet.core.mpda_core import MPDATransmitter, MPDAReceiver, SAMPLE_RATE, CHAR_SET, ENCODINGS
+from tng_packet.core.mpda_multi import MPDAAutoReceiver
+from tng_packet.core.ring_buffer import SharedRingBuffer
+from tng_packet.core.spectrum import SpectralEngine, DisplayScaler, FFT_SIZES, AVERAGING_MODES
+from tng_packet.core.waterfall import WaterfallBuffer
+
+TRACKS = (1, 4, 8)
+SPEEDS = (5, 10, 20)
+MESSAGE_LENGTHS = (16, 64, 256)
+CHUNK_SIZES = (256, 1024, 4096, 16384)
+SNRS = (-12, -9, -6, -3, 0, 3, 6, 10)
+PROFILES = {
+    'awgn': {},
+    'offset': {'freq_offset': 5.0},
+    'drift': {'drift_ppm': 200.0},
+    'fading': {'fading_hz': 0.5, 'fading_depth': 0.7},
+}
+# Synthesis precision of the transmitter, and receiver input formats: name -> (sample dtype, receiver dtype)
+TX_DTYPES = ('float64', 'float32')
+RX_FORMATS = {'float64': (np.float64, np.float64), 'float32': (np.float32, np.float32), 'int16': (np.int16, np.float32)}
+RECEIVERS = ('fixed', 'auto')
+QUICK = {'tracks': (4,), 'speeds': (10,), 'lengths': (16, 64), 'chunks': (1024,), 'snrs': (-6, 0, 10),
+         'profiles': ('awgn',), 'encodings': ('legacy',), 'texts': ('random',), 'fft_sizes': (1024,), 'trials': 2, 'repeat': 2}
+LINK_MESSAGE_LENGTH = 24
+# Text kinds of the tx rows: 'random' is uniform over the character set, 'qso' is built from these words
+TEXTS = ('random', 'qso')
+QSO_WORDS = ('CQ', 'DE', 'HL1ABC', 'JA1XYZ', '6L5TNG', 'W1AW', 'K', 'BK', 'R', 'TNX', 'FER', 'QSO', 'UR', 'RST', '599',
+             '579', 'NAME', 'QTH', 'SEOUL', 'TOKYO', 'PM37', 'PM95', 'FN31', 'HW?', '73', 'GL', 'SK', 'TU', 'OM', 'GM',
+             'ES', 'RIG', 'ANT', 'PWR', '100W', 'WX', 'QSL?', 'QRZ?', 'DX')
+# Silence around every transmission, like the gaps between messages on air
+LEAD_SECONDS = 0.5
+TAIL_SECONDS = 1.0
+FEED_SECONDS = 0.25
+# Spectrum path allocation check: frames measured after WARMUP_FRAMES, in render batches of ALLOC_BATCH
+# (like one GUI paint), and the bytes it may allocate: net (leaks, growing buffers) and peak (per-frame temporaries)
+ALLOC_FRAMES = 500
+ALLOC_WARMUP_FRAMES = 256
+ALLOC_BATCH = 4
+ALLOC_NET_LIMIT = 4096
+ALLOC_PEAK_LIMIT = 16384
+# Figure of merit per section and whether a larger value is better (used by --compare)
+METRICS = {'tx': ('best_ms', False), 'rx': ('samples_per_sec', True), 'link': ('cer', False), 'alloc': ('net_bytes', False)}
+KEYS = {'tx': ('dtype', 'encoding', 'text', 'tracks', 'speed', 'length'), 'rx': ('dtype', 'tracks', 'speed', 'chunk'),
+        'link': ('profile', 'encoding', 'receiver', 'tracks', 'speed', 'snr_db'), 'alloc': ('fft_size', 'averaging')}
+# Reports written before a key existed ran with this value (all float64 before the dtype rows, legacy framing,
+# fixed receiver)
+KEY_DEFAULTS = {'dtype': 'float64', 'encoding': 'legacy', 'text': 'random', 'receiver': 'fixed'}
+
+# Printable payload characters (the newline is left out so a decode error can't look like a line break)
+_ALPHABET = np.array(list(CHAR_SET.replace('\n', '')))
+
+def random_text(length, rng):
+    return ''.join(rng.choice(_ALPHABET, length))
+
+def qso_text(length, rng):
+    words = []
+    while sum(len(w) + 1 for w in words) < length: words.append(QSO_WORDS[rng.integers(len(QSO_WORDS))])
+    return ' '.join(words)[:length]
+
+def edit_distance(a, b):
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return prev[-1]
+
+def _best_of(repeat, fn):
+    times = []
+    for _ in range(repeat):
+        t = perf_counter()
+        result = fn()
+        times.append(perf_counter() - t)
+    return times, result
+
+def decode(samples, tracks, speed, chunk=None, dtype=np.float32, receiver='fixed'):
+    """Feed samples to a fresh receiver in chunks; returns the text of the first message and whether its EOT arrived."""
+    rx = MPDAAutoReceiver() if receiver == 'auto' else MPDAReceiver(tracks, speed, dtype=dtype)
+    chunk = chunk or int(FEED_SECONDS * SAMPLE_RATE)
+    tokens = []
+    for i in range(0, len(samples), chunk):
+        tokens.extend(rx.process_audio(samples[i:i+chunk]))
+        if '<EOT>' in tokens: break
+    if '<EOT>' in tokens: return ''.join(tokens[:tokens.index('<EOT>')]), True
+    return ''.join(tokens), False
+
+def _padded(signal):
+    return np.concatenate((np.zeros(int(LEAD_SECONDS * SAMPLE_RATE), dtype=signal.dtype), signal,
+                           np.zeros(int(TAIL_SECONDS * SAMPLE_RATE), dtype=signal.dtype)))
+
+def bench_tx(tracks=TRACKS, speeds=SPEEDS, lengths=MESSAGE_LENGTHS, repeat=5, seed=0, dtypes=TX_DTYPES, encodings=ENCODINGS,
+             texts=TEXTS):
+    rows = []
+    make = {'random': random_text, 'qso': qso_text}
+    for dtype in dtypes:
+        tx = MPDATransmitter(dtype=dtype)
+        for enc, kind in ((enc, kind) for enc in encodings for kind in texts):
+            # Same texts for every encoding: audio_s compares their airtime
+            rng = np.random.default_rng(seed)
+            for t in tracks:
+                for s in speeds:
+                    for n in lengths:
+                        text = make[kind](n, rng)
+                        times, signal = _best_of(repeat, lambda: tx.generate_signal(text, t, s, enc))
+                        audio = len(signal) / SAMPLE_RATE
+                        rows.append({'dtype': dtype, 'encoding': enc, 'text': kind, 'tracks': t, 'speed': s, 'length': n, 'samples': len(signal),
+                                     'audio_s': round(audio, 3), 'first_ms': round(times[0] * 1000, 3),
+                                     'best_ms': round(min(times) * 1000, 3), 'x_realtime': round(audio / min(times), 1)})
+    return rows
+
+def bench_rx(tracks=TRACKS, speeds=SPEEDS, chunks=CHUNK_SIZES, repeat=3, length=64, seed=0, formats=tuple(RX_FORMATS)):
+    rows = []
+    for name in formats:
+        sample_dtype, rx_dtype = RX_FORMATS[name]
+        rng = np.random.default_rng(seed)
+        tx = MPDATransmitter()
+        for t in tracks:
+            for s in speeds:
+                text = random_text(length, rng)
+                samples = _padded(tx.generate_signal(text, t, s))
+                samples = to_int16(samples) if sample_dtype == np.int16 else samples.astype(sample_dtype)
+                audio = len(samples) / SAMPLE_RATE
+                for c in chunks:
+                    times, (got, complete) = _best_of(repeat, lambda: decode(samples, t, s, c, rx_dtype))
+                    best = min(times)
+                    rows.append({'dtype': name, 'tracks': t, 'speed': s, 'chunk': c, 'audio_s': round(audio, 3), 'best_ms': round(best * 1000, 3),
+                                 'samples_per_sec': round(len(samples) / best), 'rtf': round(best / audio, 6), 'ok': complete and got == text})
+    return rows
+
+def bench_link(profiles=tuple(PROFILES), tracks=TRACKS, speeds=(10,), snrs=SNRS, trials=10,
+               length=LINK_MESSAGE_LENGTH, seed=0, encodings=ENCODINGS, receivers=RECEIVERS):
+    tx = MPDATransmitter()
+    rows = []
+    for name, enc, rx in ((name, enc, rx) for name in profiles for enc in encodings for rx in receivers):
+        for t in tracks:
+            for s in speeds:
+                for snr in snrs:
+                    errors = chars = exact = complete = 0
+                    for trial in range(trials):
+                        rng = np.random.default_rng((seed, trial))
+                        text = random_text(length, rng)
+                        signal = tx.generate_signal(text, t, s, enc).astype(np.float64)
+                        channel = Channel(snr, ref_rms=float(np.sqrt(np.mean(signal ** 2))), seed=(seed, trial, 1), **PROFILES[name])
+                        got, done = decode(channel.process(_padded(signal)), t, s, receiver=rx)
+                        errors += min(edit_distance(text, got), len(text))
+                        chars += len(text)
+                        exact += done and got == text
+                        complete += done
+                    rows.append({'profile': name, 'encoding': enc, 'receiver': rx, 'tracks': t, 'speed': s, 'snr_db': snr, 'trials': trials,
+                                 'cer': round(errors / chars, 4), 'message_ok': round(exact / trials, 3),
+                                 'eot_seen': round(complete / trials, 3)})
+    return rows
+
+def _spectrum_frames(engine, reader, scaler, waterfall, frames):
+    # The SpectrumWorker + VisualWidget.update_data work per render batch, without Qt
+    for _ in range(frames // ALLOC_BATCH):
+        batch = list(engine.frames(reader, ALLOC_BATCH))
+        rows = [mag for _, mag, is_row in batch if is_row]
+        mags = scaler.load(rows + [batch[-1][1]])
+        scaler.apply(mags, 50.0, 1.0, smooth=True)
+        if rows: waterfall.push_rows(mags[:-1])
+
+def bench_alloc(fft_sizes=FFT_SIZES, averaging=AVERAGING_MODES, frames=ALLOC_FRAMES, seed=0):
+    rows = []
+    rng = np.random.default_rng(seed)
+    # Traced throughout (warm-up included), so tracemalloc's own first-use allocations aren't counted
+    tracemalloc.start()
+    try:
+        for size in fft_sizes:
+            for mode in averaging:
+                engine = SpectralEngine(SAMPLE_RATE, size, 0.5, mode, row_every=2)
+                ring = SharedRingBuffer((frames + ALLOC_WARMUP_FRAMES + 1) * engine.hop + size)
+                reader = ring.reader()
+                ring.write(rng.standard_normal(ring.capacity).astype(np.float32))
+                scaler, waterfall = DisplayScaler(), WaterfallBuffer(256, size // 2 + 1)
+                _spectrum_frames(engine, reader, scaler, waterfall, ALLOC_WARMUP_FRAMES)
+                before = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+                _spectrum_frames(engine, reader, scaler, waterfall, frames)
+                after, peak = tracemalloc.get_traced_memory()
+                net, peak = after - before, peak - before
+                rows.append({'fft_size': size, 'averaging': mode, 'frames': frames, 'net_bytes': net, 'peak_bytes': peak,
+                             'ok': net <= ALLOC_NET_LIMIT and peak <= ALLOC_PEAK_LIMIT})
+    finally: tracemalloc.stop()
+    return rows
+
+def metadata(args):
+    version_file = Path(__file__).resolve().parent.parent / 'version.json'
+    try: app = json.loads(version_file.read_text(encoding='utf-8'))
+    except (OSError, ValueError): app = {}
+    return {'app_version': app.get('version'), 'build': app.get('build'), 'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(), 'numpy': np.__version__, 'machine': platform.machine(),
+            'platform': platform.platform(), 'quick': args.quick, 'seed': args.seed}
+
+def compare(old, new, tolerance):
+    """Print the change of every row in both reports; returns the rows worse than tolerance (fraction)."""
+    worse = []
+    for section, (metric, higher_better) in METRICS.items():
+        before = {tuple(r.get(k, KEY_DEFAULTS.get(k)) for k in KEYS[section]): r for r in old.get(section, [])}
+        for row in new.get(section, []):
+            key = tuple(row.get(k, KEY_DEFAULTS.get(k)) for k in KEYS[section])
+            if key not in before: continue
+            a, b = before[key][metric], row[metric]
+            if section == 'link':
+                # Error rates: compare absolute difference (0 -> 0.01 is not "infinitely" worse)
+                change = b - a
+                bad = change > tolerance * max(a, 0.05)
+            else:
+                change = (b - a) / a if a else 0.0
+                bad = (change < -tolerance) if higher_better else (change > tolerance)
+            label = ' '.join(f'{k}={v}' for k, v in zip(KEYS[section], key))
+            delta = f'{change:+.4f}' if section == 'link' else f'{change:+.1%}'
+            print(f"{section:5} {label:40} {metric} {a} -> {b} ({delta}){'  WORSE' if bad else ''}")
+            if bad: worse.append((section, key))
+    return worse
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog='python -m tng_packet.benchmark', description='Benchmark the MPDA modem and write a JSON report.')
+    ap.add_argument('-o', '--output', help='write the JSON report here (default: stdout)')
+    ap.add_argument('--sections', default='tx,rx,link,alloc', help='comma separated subset of tx,rx,link,alloc')
+    ap.add_argument('--quick', action='store_true', help='small grid for a fast smoke run')
+    ap.add_argument('--trials', type=int, help='messages per link point (default 10)')
+    ap.add_argument('--repeat', type=int, help='timing repeats, best is reported (default 5 tx / 3 rx)')
+    ap.add_argument('--seed', type=int, default=0)
+    ap.add_argument('--compare', help='previous JSON report to compare against')
+    ap.add_argument('--tolerance', type=float, default=0.1, help='allowed relative regression for --compare')
+    args = ap.parse_args(argv)
+
+    sections = [s.strip() for s in args.sections.split(',') if s.strip()]
+    q = QUICK if args.quick else {}
+    report = {'meta': metadata(args)}
+    if 'tx' in sections:
+        report['tx'] = bench_tx(q.get('tracks', TRACKS), q.get('speeds', SPEEDS), q.get('lengths', MESSAGE_LENGTHS),
+                                args.repeat or q.get('repeat', 5), args.seed, encodings=q.get('encodings', ENCODINGS), texts=q.get('texts', TEXTS))
+    if 'rx' in sections:
+        report['rx'] = bench_rx(q.get('tracks', TRACKS), q.get('speeds', SPEEDS), q.get('chunks', CHUNK_SIZES),
+                                args.repeat or q.get('repeat', 3), seed=args.seed)
+    if 'link' in sections:
+        report['link'] = bench_link(q.get('profiles', tuple(PROFILES)), q.get('tracks', TRACKS), (10,), q.get('snrs', SNRS),
+                                    args.trials or q.get('trials', 10), seed=args.seed, encodings=q.get('encodings', ENCODINGS),
+                                    receivers=q.get('receivers', RECEIVERS))
+    if 'alloc' in sections:
+        report['alloc'] = bench_alloc(q.get('fft_sizes', FFT_SIZES), seed=args.seed)
+
+    text = json.dumps(report, indent=1)
+    if args.output: Path(args.output).write_text(text + '\n', encoding='utf-8')
+    else: print(text)
+    failed = [r for r in report.get('alloc', []) if not r['ok']]
+    for r in failed:
+        print(f"alloc fft_size={r['fft_size']} averaging={r['averaging']}: {r['net_bytes']} B net, {r['peak_bytes']} B peak "
+              f"over {r['frames']} frames", file=sys.stderr)
+    if args.compare:
+        old = json.loads(Path(args.compare).read_text(encoding='utf-8'))
+        worse = compare(old, report, args.tolerance)
+        if worse:
+            print(f'{len(worse)} regression(s) beyond {args.tolerance:.0%}', file=sys.stderr)
+            return 1
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,33 @@
+"""
+Audio I/O module used by the app: `sounddevice` (default) or `tng_packet.core.sim_audio`, the simulated
+loopback card, which has the same InputStream / OutputStream / CallbackStop / query_devices interface.
+
+    TNG_AUDIO_BACKEND=sim python launcher.py      (or: python launcher.py --sim-audio)
+
+The module is imported on first use, so choosing the backend costs nothing at startup.
+"""
+
+import importlib
+import os
+
+BACKENDS = {'sounddevice': 'sounddevice', 'sim': 'tng_packet.core.sim_audio'}
+
+_name = None
+_module = None
+
+def use(name):
+    """Select the backend by name; call before the first stream is opened."""
+    global _name, _module
+    if name not in BACKENDS: raise ValueError(f"Unknown audio backend: {name}")
+    _name, _module = name, None
+
+def name():
+    return _name or os.environ.get('TNG_AUDIO_BACKEND', 'sounddevice')
+
+def get():
+    global _module
+    if _module is None:
+        backend = name()
+        if backend not in BACKENDS: raise ValueError(f"Unknown audio backend: {backend}")
+        _module = importlib.import_module(BACKENDS[backend])
+    return _module
@@ -1,26 +1,91 @@
-import sounddevice as sd
+import threading
+from collections import deque
+from time import perf_counter
 import numpy as np
-from PyQt6.QtCore import QObject, pyqtSignal, QThread
+from PyQt6.QtCore import QObject, pyqtSignal, QThread, Qt
+from tng_packet.core import audio_backend, metrics
+from tng_packet.core.mpda_core import SAMPLE_RATE
+from tng_packet.core.ring_buffer import SharedRingBuffer
+from tng_packet.core.dsp import Decimator, SAMPLE_FORMATS
+from tng_packet.core.spectrum import SpectralEngine
+from tng_packet.core.squelch import Squelch
+
+# Capture runs at the modem rate; visual consumers get it decimated (44100 / 4 = 11025 Hz, 0-5.5 kHz)
+CAPTURE_BLOCK = 1024
+VIEW_DECIMATION = 4
+BUFFER_SECONDS = 10
+# Spectrum worker: frames allowed to wait in the ring before the oldest are skipped,
+# and spectra allowed to wait for the GUI before the oldest are coalesced away
+MAX_BACKLOG_FRAMES = 8
+MAX_PENDING_SPECTRA = 16
+# Capture timestamps kept for latency measurement (blocks)
+CLOCK_BLOCKS = 512
+# While the squelch is closed the spectrum worker analyzes one frame in this many (slower waterfall)
+IDLE_FRAME_STEP = 4
 
 class AudioMonitor(QObject):
-    data_signal = pyqtSignal(np.ndarray)
+    """
+    Shared input capture. The device is opened once (at SAMPLE_RATE unless the first shared() call asks
+    for the device's native rate, e.g. 48000) and every block is written to two
+    shared rings: `raw` (full rate in the stream's sample format, float32 or int16, for the decoder)
+    and `view` (anti-aliased and decimated float32, for spectrum/waterfall). Consumers subscribe() for their own read cursor and drain it on data_ready.
+    `squelch` scores every block as it arrives; consumers check squelch.active to idle while the band is quiet.
+    Use AudioMonitor.shared() so all widgets reuse the same stream.
+    """
+    data_ready = pyqtSignal()
+    _shared = None
+
+    @classmethod
+    def shared(cls, device_index=None, sample_rate=SAMPLE_RATE, sample_format='float32'):
+        if cls._shared is None: cls._shared = cls(device_index, sample_rate, sample_format=sample_format)
+        return cls._shared
 
-    def __init__(self, device_index=None):
+    def __init__(self, device_index=None, sample_rate=SAMPLE_RATE, decimation=VIEW_DECIMATION, sample_format='float32'):
         super().__init__()
+        if sample_format not in SAMPLE_FORMATS: raise ValueError(f"Unsupported sample format: {sample_format}")
         self.device_index = device_index
+        self.sample_rate = sample_rate
+        self.sample_format = sample_format
+        self.view_rate = sample_rate / decimation
+        self.raw = SharedRingBuffer(sample_rate * BUFFER_SECONDS, sample_format)
+        self.view = SharedRingBuffer(int(self.view_rate * BUFFER_SECONDS))
+        self._decimator = Decimator(decimation)
+        self.squelch = Squelch(sample_rate)
         self.running = False
         self.stream = None
+        self._users = set()
+        self.status_errors = 0
+        self._clock = deque(maxlen=CLOCK_BLOCKS)  # (raw.end after the block, perf_counter() at its callback)
+        self._clock_lock = threading.Lock()
+        self._last_callback = None
+        self._m_xruns = metrics.counter('audio.xruns')
+        self._m_jitter = metrics.histogram('audio.jitter_ms')
+        self._m_callback = metrics.histogram('audio.callback_ms')
 
-    def start(self):
+    def subscribe(self, decimated=False):
+        """New read cursor positioned at the newest sample: full rate, or the decimated view rate."""
+        return (self.view if decimated else self.raw).reader()
+
+    def capture_time(self, position):
+        """perf_counter() time of the callback that delivered raw sample `position - 1` (None if too old)."""
+        found = None
+        with self._clock_lock:
+            for end, t in reversed(self._clock):
+                if end < position: break
+                found = t
+        return found
+
+    def start(self, user=None):
+        """Start capture on behalf of `user`; the stream is opened once however many users there are."""
+        self._users.add(user)
         if self.running: return
         try:
-            # Sample Rate 12000 is enough for visualization (0-6kHz)
-            # Block size 1024 or 2048 for smooth update
-            self.stream = sd.InputStream(
+            self.stream = audio_backend.get().InputStream(
                 device=self.device_index,
                 channels=1,
-                samplerate=12000,
-                blocksize=1024,
+                samplerate=self.sample_rate,
+                blocksize=CAPTURE_BLOCK,
+                dtype=self.sample_format,
                 callback=self._audio_callback
             )
             self.stream.start()
@@ -28,16 +93,138 @@ class AudioMonitor(QObject):
         except Exception as e:
             print(f"Audio Stream Error: {e}")
 
-    def stop(self):
+    def stop(self, user=None):
+        """Release `user`; the stream closes when the last user is gone."""
+        self._users.discard(user)
+        if not self._users: self._close()
+
+    def _close(self):
         if self.stream:
             self.stream.stop()
             self.stream.close()
             self.stream = None
         self.running = False
 
+    def set_device(self, device_index):
+        if self.device_index == device_index: return
+        was_running = self.running
+        self._close()
+        self.device_index = device_index
+        self._decimator.reset()
+        if was_running and self._users: self.start(next(iter(self._users)))
+
     def _audio_callback(self, indata, frames, time, status):
+        now = perf_counter()
         if status:
-            print(status)
-        # indata is (frames, channels)
-        # Emit the first channel data
-        self.data_signal.emit(indata[:, 0].copy())
+            self.status_errors += 1
+            self._m_xruns.inc()
+        # Jitter: how far this callback is from one block after the previous one
+        if self._last_callback is not None: self._m_jitter.observe(abs(now - self._last_callback - frames / self.sample_rate) * 1000)
+        self._last_callback = now
+        with self._m_callback.time():
+            # indata is (frames, channels); both rings copy it in, so no extra copy here
+            block = indata[:, 0]
+            self.raw.write(block)
+            with self._clock_lock: self._clock.append((self.raw.end, perf_counter()))
+            self.view.write(self._decimator.process(block))
+            self.squelch.update(block, self.raw.end)
+        self.data_ready.emit()
+
+class SpectrumWorker(QThread):
+    """
+    Turns the decimated capture stream into ready-to-draw spectra off the GUI thread, using its own
+    SpectralEngine. The audio callback only wakes the worker; the worker reads frames from its own cursor,
+    skips frames when it falls behind (dropped_frames) or while the squelch is closed (all but one in
+    IDLE_FRAME_STEP, idle_frames) and keeps at most MAX_PENDING_SPECTRA results
+    for the GUI (coalesced_frames). At most one spectra_ready is queued to the GUI at a time,
+    so a stalled UI costs nothing but skipped rows; the slot collects results with take().
+    """
+    spectra_ready = pyqtSignal()
+
+    def __init__(self, monitor, engine=None, parent=None):
+        super().__init__(parent)
+        self.monitor = monitor
+        self.engine = engine or SpectralEngine(monitor.view_rate)
+        self.reader = monitor.subscribe(decimated=True)
+        self._config = None
+        self._pending = deque(maxlen=MAX_PENDING_SPECTRA)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._signalled = False
+        self._stopping = False
+        self.frames_processed = 0
+        self.dropped_frames = 0
+        self.coalesced_frames = 0
+        self.idle_frames = 0
+        self._m_frame = metrics.histogram('spectrum.frame_ms')
+        self._m_backlog = metrics.gauge('spectrum.backlog')
+        self._m_dropped = metrics.counter('spectrum.dropped')
+        self._m_coalesced = metrics.counter('spectrum.coalesced')
+        self._m_idle = metrics.counter('spectrum.idle_skipped')
+        # Runs in the audio thread: just a flag set, no Qt event per block
+        monitor.data_ready.connect(self._wake.set, Qt.ConnectionType.DirectConnection)
+
+    def start(self):
+        self._stopping = False
+        self.reader.skip_to_end()
+        super().start()
+
+    def stop(self):
+        self._stopping = True
+        self._wake.set()
+        self.wait()
+
+    def configure(self, **options):
+        """SpectralEngine.configure() options; applied by the worker thread before its next frame."""
+        with self._lock:
+            self._config = {**(self._config or {}), **options}
+        self._wake.set()
+
+    def run(self):
+        engine = self.engine
+        while not self._stopping:
+            self._wake.wait(0.1)
+            self._wake.clear()
+            with self._lock:
+                config, self._config = self._config, None
+            if config: engine.configure(**config)
+            frames = engine.available(self.reader)
+            self._m_backlog.set(frames)
+            if frames > MAX_BACKLOG_FRAMES:
+                skip = frames - MAX_BACKLOG_FRAMES
+                engine.skip(self.reader, skip)
+                self.dropped_frames += skip
+                self._m_dropped.inc(skip)
+                frames = MAX_BACKLOG_FRAMES
+            step = 1 if self.monitor.squelch.active else IDLE_FRAME_STEP
+            t = perf_counter()
+            analyzed = 0
+            for result in engine.frames(self.reader, frames, step):
+                self._push(result)
+                analyzed += 1
+            if frames - analyzed: self.idle_frames += frames - analyzed; self._m_idle.inc(frames - analyzed)
+            if analyzed:
+                # Mean time per frame (read, window, FFT, averaging, dB) of this batch
+                self._m_frame.observe((perf_counter() - t) * 1000 / analyzed)
+                with self._lock:
+                    notify = not self._signalled
+                    self._signalled = True
+                if notify: self.spectra_ready.emit()
+
+    def _push(self, result):
+        with self._lock:
+            if len(self._pending) == self._pending.maxlen: self.coalesced_frames += 1; self._m_coalesced.inc()
+            self._pending.append(result)
+        self.frames_processed += 1
+
+    def take(self):
+        """All (level dB, spectrum dB, is_row) computed since the last call, oldest first (GUI side)."""
+        with self._lock:
+            items = list(self._pending)
+            self._pending.clear()
+            self._signalled = False
+        return items
+
+    def stats(self):
+        return {'processed': self.frames_processed, 'dropped': self.dropped_frames,
+                'coalesced': self.coalesced_frames, 'idle': self.idle_frames, 'pending': len(self._pending), 'ring': self.reader.stats()}
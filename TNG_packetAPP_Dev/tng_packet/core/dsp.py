@@ -0,0 +1,113 @@
+from math import gcd
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Sample formats a sound card stream can be opened with (see as_float / to_int16)
+SAMPLE_FORMATS = ('float32', 'int16')
+
+def as_float(samples, dtype=np.float32):
+    """
+    Audio block as floats in [-1, 1): integer PCM is scaled by its full scale (int16: 1/32768),
+    floats are only cast, and not copied at all if already `dtype`.
+    """
+    samples = np.asarray(samples)
+    if samples.dtype.kind in 'iu': return np.multiply(samples, 1.0 / (np.iinfo(samples.dtype).max + 1), dtype=dtype)
+    return samples.astype(dtype, copy=False)
+
+def to_int16(samples, gain=1.0, out=None):
+    """Float audio in [-1, 1] -> int16 PCM (scaled by gain, rounded and clipped); written into `out` if given."""
+    scaled = np.multiply(samples, gain * 32767.0, dtype=np.float32)
+    np.rint(scaled, out=scaled)
+    np.clip(scaled, -32768, 32767, out=scaled)
+    if out is None: return scaled.astype(np.int16)
+    out[...] = scaled
+    return out
+
+def lowpass_taps(cutoff, num_taps=63):
+    """Windowed-sinc (Blackman) low-pass FIR; cutoff as a fraction of the sample rate (0 < cutoff < 0.5)."""
+    n = np.arange(num_taps) - (num_taps - 1) / 2
+    taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.blackman(num_taps)
+    return taps / np.sum(taps)
+
+def hilbert_taps(num_taps=255):
+    """Windowed (Blackman) FIR Hilbert transformer, odd length; flat above ~0.015 of the sample rate."""
+    k = np.arange(num_taps) - (num_taps - 1) // 2
+    taps = np.zeros(num_taps)
+    odd = k % 2 != 0
+    taps[odd] = 2 / (np.pi * k[odd])
+    return taps * np.blackman(num_taps)
+
+class Decimator:
+    """
+    Streaming anti-aliased integer decimator. Only every `factor`-th filter output is computed,
+    and filter history carries across blocks so block boundaries leave no seams.
+    """
+    def __init__(self, factor, num_taps=63, dtype=np.float32):
+        self.factor = factor
+        # Pass band up to 80% of the new Nyquist frequency
+        self.taps = lowpass_taps(0.4 / factor, num_taps).astype(dtype)[::-1].copy()
+        self.dtype = np.dtype(dtype)
+        self._hist = np.zeros(num_taps - 1, dtype=self.dtype)
+        self._phase = 0
+
+    def reset(self):
+        self._hist[:] = 0
+        self._phase = 0
+
+    def process(self, samples):
+        buf = np.concatenate((self._hist, as_float(samples, self.dtype)))
+        windows = sliding_window_view(buf, len(self.taps))
+        out = windows[self._phase::self.factor] @ self.taps
+        # Next block starts where this one's decimation grid left off
+        self._phase = (self._phase - len(windows)) % self.factor
+        self._hist = buf[len(buf) - len(self._hist):].copy()
+        return out
+
+class Resampler:
+    """
+    Streaming rational resampler (rate_out = rate_in * up / down) in polyphase form: only the output
+    samples are computed, each as one dot product of taps_per_phase inputs with the filter phase it
+    falls on. History and the output grid carry across blocks, so any block split gives the same output.
+    """
+    def __init__(self, rate_in, rate_out, zero_crossings=8, dtype=np.float64):
+        g = gcd(int(rate_in), int(rate_out))
+        self.up, self.down = int(rate_out) // g, int(rate_in) // g
+        self.rate_in, self.rate_out = rate_in, rate_out
+        up, m = self.up, max(self.up, self.down)
+        self.taps_per_phase = 2 * zero_crossings * m // up + 1
+        # Same pass band as Decimator: 80% of the lower Nyquist frequency, at the upsampled rate
+        taps = lowpass_taps(0.4 / m, self.taps_per_phase * up) * up
+        # bank[p] = phase p of the filter, reversed to line up with an ascending input window
+        self.bank = np.ascontiguousarray(taps.reshape(self.taps_per_phase, up).T[:, ::-1]).astype(dtype)
+        self.dtype = np.dtype(dtype)
+        self.reset()
+
+    @property
+    def delay(self):
+        """Group delay in output samples."""
+        return (self.taps_per_phase * self.up - 1) / 2 / self.down
+
+    def reset(self):
+        self._hist = np.zeros(self.taps_per_phase - 1, dtype=self.dtype)
+        self._m = 0     # next output index
+        self._n0 = 0    # input index of the next block's first sample
+
+    def process(self, samples):
+        x = as_float(samples, self.dtype)
+        up, down = self.up, self.down
+        n_end = self._n0 + len(x)
+        # Outputs m whose newest input (m * down) // up has arrived
+        m_end = -(-n_end * up // down)
+        buf = np.concatenate((self._hist, x))
+        windows = sliding_window_view(buf, self.taps_per_phase)
+        if up == 1:
+            # Plain decimation: one filter phase, every down-th window
+            first = self._m * down - self._n0
+            out = windows[first:first + (m_end - self._m) * down:down] @ self.bank[0]
+        else:
+            ms = np.arange(self._m, m_end, dtype=np.int64)
+            out = np.einsum('ij,ij->i', windows[ms * down // up - self._n0], self.bank[ms * down % up])
+        self._hist = buf[len(buf) - len(self._hist):].copy()
+        self._m, self._n0 = m_end, n_end
+        return out
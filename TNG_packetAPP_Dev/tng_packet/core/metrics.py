@@ -0,0 +1,165 @@
+"""
+Process-wide metrics for the hot paths: counters, gauges and histograms by dotted name
+(audio.*, spectrum.*, rx.*, tx.*, render.*).
+
+Off by default: enable() / TNG_METRICS=1 / the View menu. While off, inc/set/observe return after one
+attribute check and time() hands out a shared no-op context, so they can sit in audio callbacks.
+snapshot() is a JSON-ready dict, format_text() a readable report, export(path) writes either.
+"""
+
+import json
+import os
+from collections import deque
+from contextlib import nullcontext
+from time import perf_counter, strftime
+
+# Values kept per histogram for the percentiles
+HISTORY = 512
+# Shown in the status bar: (label, metric, field, format)
+STATUS_FIELDS = (('xruns', 'audio.xruns', 'value', '{:.0f}'), ('jitter', 'audio.jitter_ms', 'p95', '{:.1f} ms'),
+                 ('FFT', 'spectrum.frame_ms', 'mean', '{:.2f} ms'), ('RX lag', 'rx.lag_ms', 'value', '{:.0f} ms'),
+                 ('decode', 'rx.decode_ms', 'mean', '{:.2f} ms'), ('frame', 'render.frame_ms', 'p95', '{:.1f} ms'))
+
+class _State:
+    enabled = os.environ.get('TNG_METRICS') == '1'
+
+_NULL_TIMER = nullcontext()
+_metrics = {}
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name):
+        self.name = name
+        self.value = 0
+
+    def inc(self, n=1):
+        if _State.enabled: self.value += n
+
+    def reset(self):
+        self.value = 0
+
+    def summary(self):
+        return {'value': self.value}
+
+class Gauge:
+    """Last value set, or `fn()` read at snapshot time (no cost on the hot path)."""
+    kind = 'gauge'
+
+    def __init__(self, name, fn=None):
+        self.name = name
+        self.fn = fn
+        self.value = None
+
+    def set(self, value):
+        if _State.enabled: self.value = value
+
+    def reset(self):
+        self.value = None
+
+    def summary(self):
+        value = self.value
+        if self.fn is not None:
+            try: value = self.fn()
+            except Exception: value = None
+        return {'value': value}
+
+class _Timer:
+    __slots__ = ('hist', 't')
+
+    def __init__(self, hist):
+        self.hist = hist
+
+    def __enter__(self):
+        self.t = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe((perf_counter() - self.t) * 1000)
+
+class Histogram:
+    """Count/total/max over all observations, percentiles over the last HISTORY."""
+    kind = 'histogram'
+
+    def __init__(self, name, unit='ms'):
+        self.name = name
+        self.unit = unit
+        self.reset()
+
+    def observe(self, value):
+        if not _State.enabled: return
+        self.values.append(value)
+        self.count += 1
+        self.total += value
+        if value > self.max: self.max = value
+
+    def time(self):
+        """Context manager observing its duration in ms."""
+        return _Timer(self) if _State.enabled else _NULL_TIMER
+
+    def reset(self):
+        self.values = deque(maxlen=HISTORY)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def summary(self):
+        if not self.count: return {'count': 0, 'unit': self.unit}
+        v = sorted(self.values)
+        return {'count': self.count, 'unit': self.unit, 'last': round(self.values[-1], 3),
+                'mean': round(self.total / self.count, 3), 'p50': round(v[len(v) // 2], 3),
+                'p95': round(v[min(int(len(v) * 0.95), len(v) - 1)], 3), 'max': round(self.max, 3)}
+
+def _get(cls, name, *args):
+    m = _metrics.get(name)
+    if m is None: m = _metrics[name] = cls(name, *args)
+    elif not isinstance(m, cls): raise TypeError(f"Metric {name} is a {m.kind}")
+    return m
+
+def counter(name):
+    return _get(Counter, name)
+
+def gauge(name, fn=None):
+    g = _get(Gauge, name)
+    if fn is not None: g.fn = fn
+    return g
+
+def histogram(name, unit='ms'):
+    return _get(Histogram, name, unit)
+
+def enable(on=True):
+    _State.enabled = bool(on)
+
+def enabled():
+    return _State.enabled
+
+def reset():
+    for m in _metrics.values(): m.reset()
+
+def snapshot():
+    return {'time': strftime('%Y-%m-%dT%H:%M:%S'), 'enabled': _State.enabled,
+            'metrics': {name: {'type': m.kind, **m.summary()} for name, m in sorted(_metrics.items())}}
+
+def format_text(snap=None):
+    snap = snap or snapshot()
+    lines = [f"# metrics {snap['time']}"]
+    for name, m in snap['metrics'].items():
+        fields = ' '.join(f'{k}={v}' for k, v in m.items() if k != 'type')
+        lines.append(f"{name:28} {m['type']:9} {fields}")
+    return '\n'.join(lines) + '\n'
+
+def export(path):
+    """Write a snapshot to path: JSON if it ends in .json, text otherwise."""
+    snap = snapshot()
+    text = json.dumps(snap, indent=1) if str(path).endswith('.json') else format_text(snap)
+    with open(path, 'w', encoding='utf-8') as f: f.write(text)
+
+def status_text():
+    """Short ' | label value' string of STATUS_FIELDS for the status bar ('' while disabled)."""
+    if not _State.enabled: return ''
+    parts = []
+    for label, name, field, fmt in STATUS_FIELDS:
+        m = _metrics.get(name)
+        value = m.summary().get(field) if m is not None else None
+        if value is not None: parts.append(f"{label} {fmt.format(value)}")
+    return ''.join(f" | {p}" for p in parts)
@@ -0,0 +1,235 @@
+"""
+Real-time modem for the app: the selected mode (see tng_packet.modes) receives on a worker thread fed
+from the shared capture stream, and transmits at the same sample rate through a callback-driven
+output stream of the audio backend (sounddevice or sim_audio).
+Both directions use the streaming BaseModem contract (feed / iter_modulate), and the output stream is
+opened in the capture's sample format (float32 or int16 PCM).
+
+Latency is measured end to end (perf_counter seconds, reported in ms):
+  rx: capture callback of the newest sample the decoder needed -> characters appended in the UI
+  tx: transmit() call -> first sample at the DAC (callback time + the stream's output latency)
+"""
+
+import itertools
+import threading
+from collections import deque
+from time import perf_counter
+
+import numpy as np
+from PyQt6.QtCore import QObject, QThread, pyqtSignal, Qt
+
+from tng_packet.core import audio_backend, metrics
+from tng_packet.core.dsp import to_int16
+from tng_packet.modes import load_mode
+
+# Decoded characters are handed to the UI at most this often (an EOT flushes at once)
+RX_BATCH_SECONDS = 0.1
+# Audio kept unread while the decoder sleeps (squelch closed, modem not busy), fed first when it opens
+PRE_TRIGGER_SECONDS = 0.5
+TX_BLOCK = 1024
+LATENCY_HISTORY = 200
+
+class LatencyStats:
+    """Rolling latency figures over the last LATENCY_HISTORY measurements."""
+    def __init__(self, size=LATENCY_HISTORY):
+        self.values = deque(maxlen=size)
+        self.count = 0
+
+    def add(self, seconds):
+        self.values.append(seconds)
+        self.count += 1
+
+    def summary(self):
+        if not self.values: return {'count': 0}
+        v = np.array(self.values) * 1000
+        return {'count': self.count, 'last_ms': round(float(v[-1]), 1), 'mean_ms': round(float(v.mean()), 1),
+                'p95_ms': round(float(np.percentile(v, 95)), 1), 'max_ms': round(float(v.max()), 1)}
+
+class RxWorker(QThread):
+    """
+    Feeds every new capture sample to a modem's feed() and emits decoded text in batches.
+    While the monitor's squelch is closed and the modem is not busy() the decoder sleeps: only the last
+    PRE_TRIGGER_SECONDS stay unread, so the start of whatever opened the squelch is still decoded.
+    """
+    text_ready = pyqtSignal(str, float)  # text, capture time of the newest sample its first character needed
+
+    def __init__(self, monitor, modem, parent=None):
+        super().__init__(parent)
+        self.monitor = monitor
+        self.modem = modem
+        self.reader = monitor.subscribe()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._config = None
+        self._stopping = False
+        self._state = None
+        self._m_decode = metrics.histogram('rx.decode_ms')
+        self._m_lag = metrics.gauge('rx.lag_ms')
+        self._m_skipped = metrics.counter('rx.idle_samples')
+        self.idle_samples = 0
+        metrics.gauge('rx.decoder', lambda: self.modem.stats())
+        monitor.data_ready.connect(self._wake.set, Qt.ConnectionType.DirectConnection)
+
+    def configure(self, **options):
+        """Change modem options; applied by the worker thread before its next block."""
+        with self._lock: self._config = {**(self._config or {}), **options}
+        self._wake.set()
+
+    def start(self):
+        self._stopping = False
+        self.reader.skip_to_end()
+        super().start()
+
+    def stop(self):
+        self._stopping = True
+        self._wake.set()
+        self.wait()
+
+    def run(self):
+        text, first_in, last_emit = '', None, perf_counter()
+        while not self._stopping:
+            self._wake.wait(RX_BATCH_SECONDS)
+            self._wake.clear()
+            with self._lock: config, self._config = self._config, None
+            if config: self.modem.configure(**config)
+            n = len(self.reader)
+            if n and not self.modem.busy() and not self.monitor.squelch.heard_since(self.reader.position):
+                # Asleep: drop all but the pre-trigger tail, decode nothing
+                skip = max(n - int(PRE_TRIGGER_SECONDS * self.monitor.sample_rate), 0)
+                self.reader.consume(skip)
+                self.idle_samples += skip; self._m_skipped.inc(skip)
+                n = 0
+            # How far behind the capture the decoder is when it wakes up
+            self._m_lag.set(n / self.monitor.sample_rate * 1000)
+            if n:
+                end = self.reader.position + n
+                with self._m_decode.time(): tokens = self.modem.feed(self.reader.peek(n))
+                self.reader.consume(n)
+                if metrics.enabled(): self._count_state()
+                if tokens:
+                    if first_in is None: first_in = self.monitor.capture_time(end) or perf_counter()
+                    text += ''.join('\n' if t == '<EOT>' else t for t in tokens)
+            now = perf_counter()
+            if text and ('\n' in text or now - last_emit >= RX_BATCH_SECONDS):
+                self.text_ready.emit(text, first_in)
+                text, first_in, last_emit = '', None, now
+
+    def _count_state(self):
+        state = self.modem.stats().get('state')
+        if state != self._state:
+            metrics.counter(f'rx.state.{state}').inc()
+            self._state = state
+
+    def stats(self):
+        return {**self.modem.stats(), 'capture': self.reader.stats(), 'idle_samples': self.idle_samples,
+                'squelch': self.monitor.squelch.stats()}
+
+class ModemEngine(QObject):
+    """
+    RX + TX for one mode, loaded by name from the mode registry with its options (MPDA: tracks, speed).
+    Connect text_received for decoded text and tx_finished for the end of a transmission (normal or
+    halted); stats() returns the latency figures.
+    """
+    text_received = pyqtSignal(str)
+    tx_finished = pyqtSignal()
+
+    def __init__(self, monitor, mode='MPDA', output_device=None, **options):
+        super().__init__()
+        self.monitor = monitor
+        self.mode = mode
+        self.options = dict(options)
+        self.output_device = output_device
+        # Separate instances: RX state lives on the worker thread, TX runs from the GUI/audio threads
+        self.transmitter = load_mode(mode, sample_rate=monitor.sample_rate, **options)
+        self.rx = RxWorker(monitor, load_mode(mode, sample_rate=monitor.sample_rate, **options), self)
+        self.rx.text_ready.connect(self._on_text)
+        self.tx_stream = None
+        self._tx_blocks = None
+        self._tx_gain = 1.0
+        self._tx_click = None
+        self.tx_underruns = 0
+        self._m_underruns = metrics.counter('tx.underruns')
+        self.rx_latency = LatencyStats()
+        self.tx_latency = LatencyStats()
+        self._sd = None
+        self.tx_finished.connect(self._close_tx)
+
+    def start(self):
+        self.monitor.start(self)
+        if not self.rx.isRunning(): self.rx.start()
+
+    def stop(self):
+        self.halt()
+        self._close_tx()
+        self.rx.stop()
+        self.monitor.stop(self)
+
+    def configure(self, **options):
+        self.options.update(options)
+        self.transmitter.configure(**options)
+        self.rx.configure(**options)
+
+    def _on_text(self, text, captured):
+        self.text_received.emit(text)
+        # Slots connected to text_received ran synchronously above, so the text is on screen now
+        self.rx_latency.add(perf_counter() - captured)
+
+    @property
+    def transmitting(self):
+        return self.tx_stream is not None
+
+    def transmit(self, text, gain=1.0):
+        """Start sending text. Returns False if busy, text is empty or the output could not be opened."""
+        if self.tx_stream is not None or not text: return False
+        self._tx_click = perf_counter()
+        blocks = self.transmitter.iter_modulate(text, TX_BLOCK)
+        # First block (and the synthesis tables) are made here, not in the audio callback
+        first = next(blocks, None)
+        if first is None: return False
+        self._tx_blocks = itertools.chain([first], blocks)
+        self._tx_gain = float(gain)
+        self._sd = audio_backend.get()
+        try:
+            self.tx_stream = self._sd.OutputStream(
+                device=self.output_device,
+                channels=1,
+                samplerate=self.monitor.sample_rate,
+                blocksize=TX_BLOCK,
+                dtype=self.monitor.sample_format,
+                callback=self._tx_callback,
+                finished_callback=self.tx_finished.emit
+            )
+            self.tx_stream.start()
+        except Exception as e:
+            print(f"Audio Output Error: {e}")
+            self.tx_stream = None
+            return False
+        return True
+
+    def halt(self):
+        if self.tx_stream is not None: self.tx_stream.abort()
+
+    def _tx_callback(self, outdata, frames, time, status):
+        if status: self.tx_underruns += 1; self._m_underruns.inc()
+        block = next(self._tx_blocks, None)
+        if block is None:
+            outdata.fill(0)
+            raise self._sd.CallbackStop
+        n = min(frames, len(block))
+        if outdata.dtype == np.int16: to_int16(block[:n], self._tx_gain, out=outdata[:n, 0])
+        else: np.multiply(block[:n], self._tx_gain, out=outdata[:n, 0])
+        outdata[n:] = 0
+        if self._tx_click is not None:
+            self.tx_latency.add(perf_counter() - self._tx_click + max(time.outputBufferDacTime - time.currentTime, 0.0))
+            self._tx_click = None
+
+    def _close_tx(self):
+        # Runs in the GUI thread after the stream finished (a stream can't be closed from its own callback)
+        if self.tx_stream is not None and not self.tx_stream.active:
+            self.tx_stream.close()
+            self.tx_stream = None
+            self._tx_blocks = None
+
+    def stats(self):
+        return {'rx_latency': self.rx_latency.summary(), 'tx_latency': self.tx_latency.summary(),
+                'tx_underruns': self.tx_underruns, 'rx': self.rx.stats()}
@@ -1,10 +1,24 @@
 """
 MPDA (Multi-Parallel Differential ASK) Protocol Library
 Version: 4.1.0
+
+Single precision by default: the transmitter synthesizes in float32 and the receiver keeps float32
+samples and correlates in complex64 (int16 / float32 blocks from the sound card go in as they are).
+Pass dtype=np.float64 for the double-precision reference path (bit-exact with the original code).
+
+Payload encodings (ENCODINGS), chosen by the transmitter and recognized per frame by the receiver:
+  legacy:   SYNC x3, one CHAR_MAP byte per character, EOT x3
+  varicode: SYNC x2, VARICODE_BYTE x2, one variable-length code per character followed by '00', EOT code x2.
+            Codes start and end with 1 and never contain '00', so a bit error costs a character or two
+            and never the framing; the shortest go to the most frequent characters of QSO text.
 """
 
+from math import gcd
+
 import numpy as np
-from collections import deque
+from numpy.lib.stride_tricks import sliding_window_view
+from tng_packet.core.dsp import as_float
+from tng_packet.core.ring_buffer import RingBuffer
 
 SAMPLE_RATE = 44100
 PILOT_FREQ = 2200
@@ -16,222 +30,610 @@ BEEP_DURATION = 0.3
 FADE_DURATION = 0.005
 GAP_DURATION = 0.15
 
+# Receiver buffering (seconds): ring capacity, and how much is kept when it overflows
+RX_BUFFER_SECONDS = 10
+RX_KEEP_DECODE_SECONDS = 3
+RX_KEEP_SEARCH_SECONDS = 5
+
+# Pilot acquisition: sliding-DFT hops per cycle, and short window (seconds) used to time the pilot falloff
+PILOT_SEARCH_STEPS = 8
+PILOT_EDGE_WINDOW = 0.002
+# Shortest tone accepted as a pilot (rejects the end-of-message beep), and how many
+# bits the decoder hunts for SYNC_BYTE before giving up and searching for a pilot again
+PILOT_MIN_DURATION = 0.6
+SYNC_TIMEOUT_BITS = 64
+
 CHAR_SET = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789 !@#$%^&*()-_=+[]{};:',.<>/?\n"
 CHAR_MAP = {char: i + 1 for i, char in enumerate(CHAR_SET)}
 REV_CHAR_MAP = {i + 1: char for i, char in enumerate(CHAR_SET)}
 
+# Receiver lookup tables: byte code -> character, and which codes are valid characters
+_CODE_TABLE = np.array([REV_CHAR_MAP.get(i, '') for i in range(256)], dtype=object)
+_CODE_VALID = np.array([i in REV_CHAR_MAP for i in range(256)])
+_BIT_WEIGHTS = 1 << np.arange(7, -1, -1)
+_NO_BITS = np.zeros(0, dtype=np.uint8)
+
+ENCODINGS = ('legacy', 'varicode')
+# Sent twice after the SYNC bytes of a varicode frame (at least 2 bits from every legacy code);
+# the pair is recognized with up to VARICODE_HEADER_ERRORS bit errors
+VARICODE_BYTE = 0xE7
+VARICODE_HEADER_ERRORS = 3
+# Most frequent first in QSO text (callsigns, RST, grid, Q-codes, common words); the rest of CHAR_SET follows
+VARICODE_ORDER = " ETOANIRS59CDKLH1UMQ730PGWBY2468FVXJZ?/\n<EOT>.,etaoinsrhldcumfpgwybvkxjqz"
+
+def _varicodes(n):
+    """The n shortest bit strings that start and end with 1 and contain no '00', shortest first."""
+    codes, length = [], 1
+    while len(codes) < n:
+        for value in range(1 << (length - 1), 1 << length):
+            code = format(value, 'b')
+            if code.endswith('1') and '00' not in code: codes.append(code)
+        length += 1
+    return codes[:n]
+
+def _varicode_symbols():
+    head, _, tail = VARICODE_ORDER.partition('<EOT>')
+    ranked = list(head) + ['<EOT>'] + list(tail)
+    return ranked + [c for c in CHAR_SET if c not in ranked]
+
+# Varicode tables: symbol -> bits incl. the '00' separator (TX), code value -> symbol (RX; the leading 1
+# makes the value unique across lengths)
+_VARICODES = dict(zip(_varicode_symbols(), _varicodes(len(CHAR_SET) + 1)))
+_VARICODE_BITS = {sym: np.array([int(b) for b in code + '00'], dtype=np.uint8) for sym, code in _VARICODES.items()}
+_VARICODE_MAX_BITS = max(len(code) for code in _VARICODES.values())
+_VARICODE_TABLE = np.full(1 << _VARICODE_MAX_BITS, '', dtype=object)
+for _sym, _code in _VARICODES.items(): _VARICODE_TABLE[int(_code, 2)] = _sym
+_VARICODE_EOT = int(_VARICODES['<EOT>'], 2)
+_VARICODE_SHIFTS = np.arange(_VARICODE_MAX_BITS)
+
+# Max payload length (seconds) whose carriers are kept in the synthesis cache
+CARRIER_CACHE_SECONDS = 10.0
+
+def _get_frequencies(tracks):
+    if tracks == 8: return [600, 800, 1000, 1200, 1400, 1600, 1800, 2000]
+    elif tracks == 4: return [800, 1200, 1600, 2000]
+    elif tracks == 1: return [1500]
+    else: raise ValueError(f'Unsupported track count: {tracks}')
+
+def _tone(freq, duration, sample_rate):
+    t = np.linspace(0, duration, int(duration*sample_rate), endpoint=False)
+    return 0.5 * np.sin(2 * np.pi * freq * t)
+
+def cycle_bounds(j, sample_rate, speed):
+    """
+    Sample offset (from the first symbol) where cycle j starts (symbol k = cycles 2k and 2k+1, reference
+    then data): floor(j * sample_rate / speed).
+    When sample_rate / speed is not an integer the cycles alternate between floor and ceil lengths,
+    so symbol timing never drifts from the nominal speed (and TX/RX at different rates agree).
+    """
+    return (np.asarray(j, dtype=np.int64) * sample_rate // speed).astype(np.intp)
+
+class _SynthTables:
+    """
+    Per-(tracks, speed, sample rate, dtype) synthesis tables: fade ramps, symbol levels,
+    pilot/gap/beep and a carrier block reused across messages.
+    In float64 every value is computed exactly like the original per-bit loop so output stays bit-exact.
+    """
+    def __init__(self, tracks, speed, sample_rate, dtype=np.float64):
+        self.tracks = tracks
+        self.speed = speed
+        self.sample_rate = sample_rate
+        self.dtype = np.dtype(dtype)
+        self.cycle_samples = int(sample_rate / speed)
+        # Whole number of samples per cycle: every cycle has the same length (fast reshape path)
+        self.exact = sample_rate % speed == 0
+        self.freqs = _get_frequencies(tracks)
+        self.omegas = np.array([2 * np.pi * f for f in self.freqs])
+        self.fade_len = int(FADE_DURATION * sample_rate)
+
+        # Symbol ramps (clipped to one cycle like the original loop)
+        # rise: previous amplitude (start=0.0, bit0=0.1, bit1=1.0) -> 0.5 reference level
+        # data: 0.5 -> target level of the bit
+        n = min(self.fade_len, self.cycle_samples)
+        self.ramp_len = n
+        self.levels = np.array([0.1, 1.0])
+        self.rise_ramps = np.array([np.linspace(a, 0.5, n) for a in (0.0, 0.1, 1.0)]).reshape(3, n)
+        self.data_ramps = np.array([np.linspace(0.5, a, n) for a in (0.1, 1.0)]).reshape(2, n)
+        self.fade_in = np.linspace(0.0, 1.0, self.fade_len)
+        self.fade_out = np.linspace(1.0, 0.0, self.fade_len)
+        # Single precision: one period of every tone (integer Hz at an integer rate), tiled on demand,
+        # so the phase is exact however long the message is
+        self._periods = [np.sin(2 * np.pi * f * np.arange(sample_rate // gcd(f, sample_rate)) / sample_rate).astype(self.dtype)
+                         for f in self.freqs] if self.dtype != np.float64 else None
+
+        self.pilot = _tone(PILOT_FREQ, PILOT_DURATION, sample_rate)
+        self.pilot[-self.fade_len:] *= self.fade_out
+        self.gap = np.zeros(int(GAP_DURATION * sample_rate))
+        self.beep = _tone(PILOT_FREQ, BEEP_DURATION, sample_rate)
+        self.beep[:self.fade_len] *= self.fade_in
+        self.beep[-self.fade_len:] *= self.fade_out
+
+        # Worst-case payload peak (all envelopes at 1.0), known before any bit is synthesized.
+        # Every plan frequency is an integer Hz, so one second of samples spans a full period.
+        t = np.arange(sample_rate) / sample_rate
+        payload_peak = np.max(np.sum(np.abs(np.sin(np.multiply.outer(self.omegas, t))), axis=0)) / tracks
+        self.peak = max(float(np.max(np.abs(self.pilot))), float(payload_peak))
+
+        for name in ('rise_ramps', 'data_ramps', 'levels', 'fade_in', 'fade_out', 'pilot', 'gap', 'beep'):
+            setattr(self, name, getattr(self, name).astype(self.dtype))
+        self._carrier_step = None
+        self._carriers = np.zeros((tracks, 0), dtype=self.dtype)
+
+    def carrier(self, track, k0, n, step):
+        """Carrier of one track for payload samples k0..k0+n (time grid k * step, like np.linspace)."""
+        if self._periods is None: return np.sin(self.omegas[track] * (np.arange(k0, k0 + n, dtype=np.float64) * step))
+        period = self._periods[track]
+        return np.resize(np.roll(period, -(k0 % len(period))), n)
+
+    def carriers(self, total_samples):
+        """(tracks, total_samples) sin carriers on the np.linspace grid, or None if too long to cache."""
+        # linspace(0, T, n, endpoint=False) == arange(n) * ((T - 0) / n): grids only match
+        # between messages when that step is identical, so the cache is keyed on it.
+        step = (total_samples / self.sample_rate) / total_samples
+        if step == self._carrier_step and self._carriers.shape[1] >= total_samples:
+            return self._carriers[:, :total_samples]
+        if total_samples > CARRIER_CACHE_SECONDS * self.sample_rate: return None
+        self._carrier_step = step
+        self._carriers = np.array([self.carrier(i, 0, total_samples, step) for i in range(self.tracks)])
+        return self._carriers
+
+    def bounds(self, j0, j1):
+        """Sample offsets of cycles j0..j1 (inclusive) from the first symbol."""
+        return cycle_bounds(np.arange(j0, j1 + 1), self.sample_rate, self.speed)
+
+    def payload_samples(self, cycles):
+        return int(cycle_bounds(2 * cycles, self.sample_rate, self.speed))
+
+    def envelopes(self, track_bits, first=0):
+        """
+        Bit matrix (..., cycles) -> amplitude envelopes of those cycles, the first being cycle `first`
+        of the message (it decides the cycle lengths when sample_rate / speed is fractional).
+        """
+        track_bits = np.asarray(track_bits, dtype=np.intp)
+        n, c = self.ramp_len, self.cycle_samples
+        prev = np.zeros_like(track_bits)
+        prev[..., 1:] = track_bits[..., :-1] + 1
+        if not self.exact:
+            # Variable cycle lengths: constant levels repeated per cycle, ramps written at each start
+            bounds = self.bounds(2 * first, 2 * (first + track_bits.shape[-1]))
+            starts, lengths = bounds[:-1] - bounds[0], np.diff(bounds)
+            half_levels = np.empty(track_bits.shape + (2,), dtype=self.dtype)
+            half_levels[..., 0] = 0.5
+            half_levels[..., 1] = self.levels[track_bits]
+            env = np.repeat(half_levels.reshape(track_bits.shape[:-1] + (-1,)), lengths, axis=-1)
+            ramps = np.stack((self.rise_ramps[prev], self.data_ramps[track_bits]), axis=-2)
+            env[..., (starts[:, None] + np.arange(n)).ravel()] = ramps.reshape(track_bits.shape[:-1] + (-1,))
+            return env
+        env = np.empty(track_bits.shape + (2, c), dtype=self.dtype)
+        env[..., 0, n:] = 0.5
+        env[..., 0, :n] = self.rise_ramps[prev]
+        env[..., 1, n:] = self.levels[track_bits][..., None]
+        env[..., 1, :n] = self.data_ramps[track_bits]
+        return env.reshape(track_bits.shape[:-1] + (-1,))
+
+_SYNTH_CACHE = {}
+
+def _synth_tables(tracks, speed, sample_rate=SAMPLE_RATE, dtype=np.float64):
+    key = (tracks, speed, sample_rate, np.dtype(dtype))
+    tables = _SYNTH_CACHE.get(key)
+    if tables is None:
+        tables = _SYNTH_CACHE[key] = _SynthTables(tracks, speed, sample_rate, dtype)
+    return tables
+
+# Payload cycles synthesized per step of MPDATransmitter.iter_signal
+STREAM_CHUNK_CYCLES = 4
+
+def _frame_bits(text, tracks, encoding='legacy'):
+    """Text -> (tracks, cycles) bit matrix incl. SYNC/EOT framing, MSB first, round-robin over tracks."""
+    if encoding == 'legacy':
+        codes = [SYNC_BYTE] * 3 + [CHAR_MAP.get(char, 63) for char in text] + [EOT_BYTE] * 3
+        bits = np.unpackbits(np.array(codes, dtype=np.uint8))
+    elif encoding == 'varicode':
+        unknown = _VARICODE_BITS[REV_CHAR_MAP[63]]
+        bits = np.concatenate([np.unpackbits(np.array([SYNC_BYTE, SYNC_BYTE, VARICODE_BYTE, VARICODE_BYTE], dtype=np.uint8))]
+                              + [_VARICODE_BITS.get(char, unknown) for char in text] + [_VARICODE_BITS['<EOT>']] * 2)
+    else: raise ValueError(f'Unsupported encoding: {encoding}')
+    remainder = len(bits) % tracks
+    if remainder: bits = np.concatenate((bits, np.zeros(tracks - remainder, dtype=np.uint8)))
+    return bits.reshape(-1, tracks).T.astype(np.intp)
+
 class MPDATransmitter:
-    def _get_frequencies(self, tracks):
-        if tracks == 8: return [600, 800, 1000, 1200, 1400, 1600, 1800, 2000]
-        elif tracks == 4: return [800, 1200, 1600, 2000]
-        elif tracks == 1: return [1500]
-        else: raise ValueError(f'Unsupported track count: {tracks}')
-
-    def _apply_fade(self, arr, start, length, mode='in'):
-        if start >= len(arr): return
-        actual_len = min(length, len(arr) - start)
-        if actual_len > 0:
-            if mode == 'in': envelope = np.linspace(0.0, 1.0, actual_len)
-            else: envelope = np.linspace(1.0, 0.0, actual_len)
-            arr[start:start+actual_len] *= envelope
-
-    def generate_signal(self, text, tracks=4, speed=10):
+    """Synthesis runs in `dtype` (float32, or float64 for the reference path); output is float32 either way."""
+    def __init__(self, sample_rate=SAMPLE_RATE, dtype=np.float32):
+        self.sample_rate = sample_rate
+        self.dtype = np.dtype(dtype)
+
+    def generate_signal(self, text, tracks=4, speed=10, encoding='legacy'):
         if not text: return np.array([], dtype=np.float32)
-        cycle_samples = int(SAMPLE_RATE / speed)
-        freqs = self._get_frequencies(tracks)
+        tables = _synth_tables(tracks, speed, self.sample_rate, self.dtype)
+        track_bits = _frame_bits(text, tracks, encoding)
+        total_samples = tables.payload_samples(track_bits.shape[1])
+        carriers = tables.carriers(total_samples)
+        step = (total_samples / self.sample_rate) / total_samples
 
-        full_bits = []
-        def append_bytes(byte_val, repeat_count):
-            for _ in range(repeat_count):
-                for i in range(7, -1, -1): full_bits.append((byte_val >> i) & 1)
-
-        append_bytes(SYNC_BYTE, 3)
-        for char in text:
-            code = CHAR_MAP.get(char, 63)
-            for i in range(7, -1, -1): full_bits.append((code >> i) & 1)
-        append_bytes(EOT_BYTE, 3)
-
-        remainder = len(full_bits) % tracks
-        if remainder: full_bits.extend([0] * (tracks - remainder))
-
-        track_bits = [full_bits[i::tracks] for i in range(tracks)]
-        num_cycles = len(track_bits[0])
-        total_samples = num_cycles * 2 * cycle_samples
-        
-        t_global = np.linspace(0, total_samples / SAMPLE_RATE, total_samples, endpoint=False)
-        final_sig = np.zeros(total_samples)
-        fade_len = int(FADE_DURATION * SAMPLE_RATE)
-
-        for trk_idx, f in enumerate(freqs):
-            carrier = np.sin(2 * np.pi * f * t_global)
-            envelope = np.zeros(total_samples)
-            bits = track_bits[trk_idx]
-            current_amp = 0.0
-            
-            for i, bit in enumerate(bits):
-                start = i * 2 * cycle_samples
-                mid = start + cycle_samples
-                end = mid + cycle_samples
-                end = min(end, total_samples)
-                mid = min(mid, total_samples)
-
-                envelope[start:mid] = 0.5
-                fade_end = min(start + fade_len, mid)
-                if fade_end > start:
-                    envelope[start:fade_end] = np.linspace(current_amp, 0.5, fade_end - start)
-                
-                target = 1.0 if bit == 1 else 0.1
-                envelope[mid:end] = target
-                fade_end = min(mid + fade_len, end)
-                if fade_end > mid:
-                    envelope[mid:fade_end] = np.linspace(0.5, target, fade_end - mid)
-                
-                current_amp = target
-            final_sig += carrier * envelope
-
-        if tracks > 0: final_sig /= tracks
-
-        t_pilot = np.linspace(0, PILOT_DURATION, int(PILOT_DURATION*SAMPLE_RATE), endpoint=False)
-        pilot_sig = 0.5 * np.sin(2 * np.pi * PILOT_FREQ * t_pilot)
-        self._apply_fade(pilot_sig, len(pilot_sig)-fade_len, fade_len, mode='out')
-
-        gap = np.zeros(int(GAP_DURATION * SAMPLE_RATE))
-        
-        t_beep = np.linspace(0, BEEP_DURATION, int(BEEP_DURATION*SAMPLE_RATE), endpoint=False)
-        beep_sig = 0.5 * np.sin(2 * np.pi * PILOT_FREQ * t_beep)
-        self._apply_fade(beep_sig, 0, fade_len, mode='in')
-        self._apply_fade(beep_sig, len(beep_sig)-fade_len, fade_len, mode='out')
-        
+        # Accumulate track by track: keeps the original summation order (bit-exact)
+        # and only one uncached carrier/envelope pair alive at a time.
+        final_sig = np.zeros(total_samples, dtype=self.dtype)
+        for trk_idx in range(tracks):
+            carrier = carriers[trk_idx] if carriers is not None else tables.carrier(trk_idx, 0, total_samples, step)
+            final_sig += carrier * tables.envelopes(track_bits[trk_idx])
+        final_sig /= tracks
+
+        fade_len = tables.fade_len
         if len(final_sig) > fade_len:
-            self._apply_fade(final_sig, 0, fade_len, mode='in')
-            self._apply_fade(final_sig, len(final_sig)-fade_len, fade_len, mode='out')
+            final_sig[:fade_len] *= tables.fade_in
+            final_sig[-fade_len:] *= tables.fade_out
 
-        full_signal = np.concatenate((pilot_sig, gap, final_sig, gap, beep_sig))
+        full_signal = np.concatenate((tables.pilot, tables.gap, final_sig, tables.gap, tables.beep))
         max_amp = np.max(np.abs(full_signal))
         if max_amp > 0: full_signal = full_signal / max_amp * 0.95
         return full_signal.astype(np.float32)
 
+    def iter_signal(self, text, tracks=4, speed=10, block_size=1024, encoding='legacy'):
+        """
+        Streaming version of generate_signal: yields float32 blocks of exactly block_size samples
+        (the last one zero padded), ready to copy into a sounddevice OutputStream callback.
+        Normalization uses the worst-case peak of the mode instead of the message peak,
+        so the level can be slightly lower than generate_signal but never clips.
+        """
+        if not text: return
+        tables = _synth_tables(tracks, speed, self.sample_rate, self.dtype)
+        scale = 0.95 / tables.peak
+        block = np.zeros(block_size, dtype=np.float32)
+        fill = 0
+        for segment in self._iter_segments(tables, _frame_bits(text, tracks, encoding)):
+            pos = 0
+            while pos < len(segment):
+                n = min(block_size - fill, len(segment) - pos)
+                np.multiply(segment[pos:pos+n], scale, out=block[fill:fill+n], casting='unsafe')
+                fill += n; pos += n
+                if fill == block_size:
+                    yield block.copy()
+                    fill = 0
+        if fill:
+            block[fill:] = 0.0
+            yield block
+
+    def _iter_segments(self, tables, track_bits):
+        """Unnormalized pilot, gap, payload (a few cycles at a time), gap, beep."""
+        yield tables.pilot
+        yield tables.gap
+        tracks, cycles = track_bits.shape
+        total_samples = tables.payload_samples(cycles)
+        # Same time grid as np.linspace(0, total/SR, total, endpoint=False) in generate_signal
+        step = (total_samples / tables.sample_rate) / total_samples
+        fade_len = tables.fade_len
+        for c0 in range(0, cycles, STREAM_CHUNK_CYCLES):
+            c1 = min(c0 + STREAM_CHUNK_CYCLES, cycles)
+            k0 = tables.payload_samples(c0)
+            n = tables.payload_samples(c1) - k0
+            # One cycle of look-back gives the first ramp its previous level; it is cut off again
+            envelopes = tables.envelopes(track_bits[:, max(c0 - 1, 0):c1], max(c0 - 1, 0))
+            if c0: envelopes = envelopes[:, k0 - tables.payload_samples(c0 - 1):]
+            chunk = np.zeros(n, dtype=tables.dtype)
+            for trk_idx in range(tracks):
+                chunk += tables.carrier(trk_idx, k0, n, step) * envelopes[trk_idx]
+            chunk /= tracks
+            if total_samples > fade_len:
+                head = min(fade_len - k0, len(chunk))
+                if head > 0: chunk[:head] *= tables.fade_in[k0:k0+head]
+                tail = total_samples - fade_len - k0
+                if tail < len(chunk): chunk[max(tail, 0):] *= tables.fade_out[max(-tail, 0):]
+            yield chunk
+        yield tables.gap
+        yield tables.beep
+
 class MPDAReceiver:
-    def __init__(self, tracks=4, speed=10):
+    """
+    Buffers and correlates in `dtype` (float32 -> complex64 templates, or float64 -> complex128).
+    process_audio() takes int16 or float blocks; integer PCM is scaled to [-1, 1).
+    """
+    # Consecutive SYNC_BYTEs that must be seen to lock (a message starts with three)
+    sync_bytes = 1
+
+    def __init__(self, tracks=4, speed=10, sample_rate=SAMPLE_RATE, dtype=np.float32):
+        self.sample_rate = sample_rate
+        self.dtype = np.dtype(dtype)
+        self.complex_dtype = np.result_type(self.dtype, np.complex64)
         self.reset()
         self.configure(tracks, speed)
 
     def reset(self):
         self.state = 'IDLE'
-        self.buffer = np.array([])
-        self.bits = deque()
+        self.buffer = RingBuffer(self.sample_rate * RX_BUFFER_SECONDS, self.dtype)
+        self.bits = _NO_BITS
         self.sync_locked = False
+        self.encoding = None  # of the current/last frame, known once the header after SYNC is read
+        self.codes_read = 0     # codes framed since the SYNC lock, and how many of them were no character
+        self.codes_invalid = 0
         self.templates = {}
+        self.payload_start = None  # absolute input sample where the current/last message's first symbol starts
+        self.payload_end = None    # absolute input sample where the last complete message's EOT symbol ends
+        self._pilot_seen = 0
+        self._hunted_bits = 0
+        self._symbols_done = 0  # symbols consumed since payload_start (places fractional cycle bounds)
 
     def configure(self, tracks, speed):
         self.current_tracks = tracks
         self.current_speed = speed
         self._precompute_templates(tracks, speed)
         self.state = 'IDLE'
-        self.buffer = np.array([])
-        self.bits = deque()
+        self.buffer.clear()
+        self.bits = _NO_BITS
         self.sync_locked = False
 
     def _get_frequencies(self, tracks):
-        if tracks == 8: return [600, 800, 1000, 1200, 1400, 1600, 1800, 2000]
-        elif tracks == 4: return [800, 1200, 1600, 2000]
-        elif tracks == 1: return [1500]
-        return []
+        return _get_frequencies(tracks)
 
     def _precompute_templates(self, tracks, speed):
         self.templates.clear()
-        length = int(SAMPLE_RATE / speed)
+        sr = self.sample_rate
+        length = int(sr / speed)
         t = np.linspace(0, 1.0 / speed, length, endpoint=False)
-        self.templates['pilot'] = np.conjugate(np.exp(1j * 2 * np.pi * PILOT_FREQ * t))
-        for f in self._get_frequencies(tracks):
-            self.templates[f] = np.conjugate(np.exp(1j * 2 * np.pi * f * t))
-
-    def _correlate(self, chunk, key):
-        if len(chunk) == 0: return 0.0
-        ref = self.templates.get(key)
-        if ref is None: return 0.0
-        n = min(len(chunk), len(ref))
-        if n < 10: return 0.0
-        return np.abs(np.sum(chunk[:n] * ref[:n])) / n
+        cdt = self.complex_dtype
+        self.templates['pilot'] = np.conjugate(np.exp(1j * 2 * np.pi * PILOT_FREQ * t)).astype(cdt)
+        # One period of the pilot mixer (SR / gcd(f, SR) samples) for the sliding DFT
+        period = sr // np.gcd(PILOT_FREQ, sr)
+        self.pilot_osc = np.exp(-1j * 2 * np.pi * PILOT_FREQ * np.arange(period) / sr).astype(cdt)
+        freqs = self._get_frequencies(tracks)
+        for f in freqs:
+            self.templates[f] = np.conjugate(np.exp(1j * 2 * np.pi * f * t)).astype(cdt)
+        # Filter bank for the DECODE state: real/imag parts of every track template side by side,
+        # so all tracks of many symbols are correlated in a single real matrix product.
+        bank = np.array([self.templates[f] for f in freqs]).T.reshape(length, len(freqs))
+        self.demod_matrix = np.ascontiguousarray(np.hstack((bank.real, bank.imag)))
+
+    def _cycle_starts(self, n_symbols):
+        """Offsets from the read cursor of the 2 * n_symbols cycles of the next symbols."""
+        done = 2 * self._symbols_done
+        bounds = cycle_bounds(np.arange(done, done + 2 * n_symbols + 1), self.sample_rate, self.current_speed)
+        return bounds - bounds[0]
+
+    def _symbols_span(self, n_symbols):
+        """Samples taken by the next n_symbols symbols."""
+        return int(self._cycle_starts(n_symbols)[-1])
+
+    def _demodulate(self, samples, threshold_ratio, starts=None):
+        """
+        Samples of K whole symbols (ref cycle + data cycle each) -> (K, tracks) bit matrix.
+        Per track: |correlation of the data cycle with the track's template| > threshold_ratio x the reference cycle's.
+        With fractional cycle lengths `starts` gives each cycle's offset; cycle_len samples are used from each.
+        """
+        cycle_len, width = self.demod_matrix.shape
+        tracks = width // 2
+        cycles = samples.reshape(-1, cycle_len) if starts is None else samples[starts[:, None] + np.arange(cycle_len)]
+        proj = cycles @ self.demod_matrix
+        energies = np.hypot(proj[:, :tracks], proj[:, tracks:]) / cycle_len
+        ref, dat = energies[0::2], energies[1::2]
+        return (dat > ref * threshold_ratio).astype(np.uint8)
+
+    def _symbol_bits(self, n_symbols, threshold_ratio):
+        """(n_symbols, tracks) bits for the whole symbols at the read cursor."""
+        if self.sample_rate % self.current_speed == 0:
+            return self._demodulate(self.buffer.peek(n_symbols * 2 * self.demod_matrix.shape[0]), threshold_ratio)
+        starts = self._cycle_starts(n_symbols)
+        return self._demodulate(self.buffer.peek(int(starts[-1])), threshold_ratio, starts[:-1])
+
+    def get_buffer_stats(self):
+        """Ring buffer fill and overflow/underrun counters of the receive path."""
+        return self.buffer.stats()
+
+    def _frame(self, bits):
+        """
+        Sync hunt and character extraction on a packed bit array (pending bits + new symbols).
+        Returns (decoded tokens, bits used up to and including EOT or None if no EOT was seen).
+        """
+        tokens = []
+        pos = 0
+        if not self.sync_locked:
+            width = 8 * self.sync_bytes
+            if len(bits) < width:
+                self.bits = bits
+                return tokens, None
+            sync = sliding_window_view(bits, 8) @ _BIT_WEIGHTS == SYNC_BYTE
+            for _ in range(self.sync_bytes - 1): sync = sync[:-8] & sync[8:]
+            hits = np.flatnonzero(sync)
+            if not len(hits):
+                self.bits = bits[-(width - 1):]
+                return tokens, None
+            self.sync_locked = True
+            self.encoding = None
+            self.codes_read = self.codes_invalid = 0
+            pos = int(hits[0]) + width
+
+        if self.encoding is None:
+            # Header: VARICODE_BYTE x2 right after this SYNC byte (locked on the second one) or one byte later
+            # (locked on the first); anything else is a legacy frame, whose SYNC bytes are skipped as invalid codes
+            if len(bits) - pos < 24:
+                self.bits = bits[pos:]
+                return tokens, None
+            errors = [bin(int(b) ^ VARICODE_BYTE).count('1') for b in np.packbits(bits[pos:pos + 24])]
+            header = min((errors[0] + errors[1], 16), (errors[1] + errors[2], 24))
+            if header[0] <= VARICODE_HEADER_ERRORS:
+                self.encoding = 'varicode'
+                pos += header[1]
+            else: self.encoding = 'legacy'
+        if self.encoding == 'varicode': return self._frame_varicode(bits, pos)
+
+        n_chars = (len(bits) - pos) // 8
+        codes = np.packbits(bits[pos:pos + n_chars * 8])
+        eot = np.flatnonzero(codes == EOT_BYTE)
+        if len(eot): codes = codes[:eot[0]]
+        # Unknown codes are skipped; the remaining SYNC bytes are not counted as invalid
+        valid = _CODE_VALID[codes]
+        self.codes_read += len(codes)
+        self.codes_invalid += int(np.count_nonzero(~valid & (codes != SYNC_BYTE)))
+        tokens.extend(_CODE_TABLE[codes[valid]].tolist())
+        if len(eot):
+            tokens.append('<EOT>')
+            self.state = 'SEARCH_PILOT'
+            self.sync_locked = False
+            self.bits = _NO_BITS
+            return tokens, pos + (int(eot[0]) + 1) * 8
+        self.bits = bits[pos + n_chars * 8:]
+        return tokens, None
+
+    def _frame_varicode(self, bits, pos):
+        """_frame for a varicode payload at bits[pos:]: a code is complete once the '00' after it has arrived."""
+        tokens = []
+        ones = pos + np.flatnonzero(bits[pos:])
+        if not len(ones):
+            self.bits = _NO_BITS
+            return tokens, None
+        # Codes are the runs of ones with single zeros inside, split wherever two or more zeros fall between ones
+        breaks = np.flatnonzero(np.diff(ones) > 2)
+        starts = ones[np.concatenate(([0], breaks + 1))]
+        ends = ones[np.concatenate((breaks, [len(ones) - 1]))]
+        keep = len(bits)
+        if len(bits) - ends[-1] < 3:
+            keep = int(starts[-1])
+            starts, ends = starts[:-1], ends[:-1]
+        lengths = ends - starts + 1
+        # Code values from the MAX_BITS window at each start (bits past the code shifted out); too long = noise
+        padded = np.concatenate((bits, np.zeros(_VARICODE_MAX_BITS, dtype=np.uint8)))
+        window = sliding_window_view(padded, _VARICODE_MAX_BITS)[starts].astype(np.intp)
+        shifts = lengths[:, None] - 1 - _VARICODE_SHIFTS
+        values = np.sum(np.where(shifts >= 0, window << np.maximum(shifts, 0), 0), axis=1)
+        values[lengths > _VARICODE_MAX_BITS] = 0
+        eot = np.flatnonzero(values == _VARICODE_EOT)
+        if len(eot): values = values[:eot[0]]
+        symbols = _VARICODE_TABLE[values]
+        known = symbols != ''
+        self.codes_read += len(values)
+        self.codes_invalid += len(values) - int(np.count_nonzero(known))
+        tokens.extend(symbols[known].tolist())
+        if len(eot):
+            tokens.append('<EOT>')
+            self.state = 'SEARCH_PILOT'
+            self.sync_locked = False
+            self.bits = _NO_BITS
+            return tokens, int(ends[eot[0]]) + 1
+        self.bits = bits[keep:]
+        return tokens, None
 
     def process_audio(self, audio_chunk):
-        if len(audio_chunk) == 0: return None
-        audio_chunk = audio_chunk - np.mean(audio_chunk)
-        self.buffer = np.concatenate((self.buffer, audio_chunk))
-        
-        MAX_BUF = SAMPLE_RATE * 10
-        if self.state == 'DECODE':
-             if len(self.buffer) > MAX_BUF: self.buffer = self.buffer[-SAMPLE_RATE * 3:]
+        """Feed audio; returns the list of every character (and '<EOT>') decoded by this call."""
+        if len(audio_chunk) == 0: return []
+        audio_chunk = as_float(audio_chunk, self.dtype)
+        # Same value as np.mean without its per-call overhead (this runs for every capture block)
+        audio_chunk = audio_chunk - np.add.reduce(audio_chunk) / len(audio_chunk)
+        # Fell behind by a whole buffer: drop to the newest few seconds like the old MAX_BUF trim
+        if self.buffer.write(audio_chunk):
+            keep = RX_KEEP_DECODE_SECONDS if self.state == 'DECODE' else RX_KEEP_SEARCH_SECONDS
+            self.buffer.keep_last(self.sample_rate * keep)
+        return self._run_states()
+
+    def _run_states(self):
+        # Run the state machine until it stops changing state, so one large block decodes completely
+        decoded = []
+        cycle_len = int(self.sample_rate / self.current_speed)
+        while True:
+            state = self.state
+            if state == 'IDLE' or state == 'SEARCH_PILOT': self._search_pilot(cycle_len)
+            elif state == 'WAIT_END': self._wait_pilot_end(cycle_len)
+            elif state == 'DECODE': decoded.extend(self._decode(cycle_len))
+            if self.state == state: break
+        return decoded
+
+    def _pilot_scores(self, window, hop, start=0, stop=None):
+        """
+        Sliding single-bin DFT at PILOT_FREQ over buffer[start:stop] (relative to the read cursor):
+        |correlation| / window for the windows starting at start, start+hop, ...
+        Same scale as the 'pilot' template's |correlation| / length.
+        """
+        samples = self.buffer.peek(offset=start) if stop is None else self.buffer.peek(stop - start, start)
+        n = len(samples)
+        if n < window: return np.zeros(0)
+        osc = self.pilot_osc
+        mixed = samples * np.resize(osc, n) if n > len(osc) else samples * osc[:n]
+        # The running sum stays in double precision: in complex64 seconds of accumulation would
+        # swamp the short windows that time the pilot edge
+        acc = np.zeros(n + 1, dtype=np.complex128)
+        np.cumsum(mixed, out=acc[1:], dtype=np.complex128)
+        starts = np.arange(0, n - window + 1, hop)
+        return np.abs(acc[starts + window] - acc[starts]) / window
+
+    def _search_pilot(self, cycle_len):
+        # Scan a few cycles at a time with PILOT_SEARCH_STEPS overlapped windows per cycle
+        if len(self.buffer) < 2 * cycle_len: return
+        hop = max(cycle_len // PILOT_SEARCH_STEPS, 1)
+        scores = self._pilot_scores(cycle_len, hop)
+        hits = np.flatnonzero(scores > 0.1)
+        if len(hits):
+            self.buffer.consume(int(hits[0]) * hop)
+            self._pilot_seen = self.buffer.position
+            self.state = 'WAIT_END'
         else:
-            if len(self.buffer) > MAX_BUF: self.buffer = self.buffer[-SAMPLE_RATE * 5:]
-
-        cycle_len = int(SAMPLE_RATE / self.current_speed)
-
-        if self.state == 'IDLE' or self.state == 'SEARCH_PILOT':
-            while len(self.buffer) > cycle_len:
-                chunk = self.buffer[:cycle_len]
-                score = self._correlate(chunk, 'pilot')
-                if score > 0.1:
-                    self.state = 'WAIT_END'
-                    self.buffer = self.buffer[cycle_len:]
-                else:
-                    self.buffer = self.buffer[cycle_len:]
-
-        elif self.state == 'WAIT_END':
-            while len(self.buffer) > cycle_len:
-                chunk = self.buffer[:cycle_len]
-                score = self._correlate(chunk, 'pilot')
-                if score < 0.05:
-                    gap_samples = int(GAP_DURATION * SAMPLE_RATE)
-                    required = gap_samples + cycle_len
-                    if len(self.buffer) < required: break 
-                    self.buffer = self.buffer[gap_samples:] 
-                    self.state = 'DECODE'
-                    self.sync_locked = False
-                    break
-                else:
-                    self.buffer = self.buffer[cycle_len:]
-
-        elif self.state == 'DECODE':
-            block_len = cycle_len * 2
-            freqs = self._get_frequencies(self.current_tracks)
-            threshold_ratio = 0.85 if self.current_speed == 5 else 0.8
-
-            while len(self.buffer) >= block_len:
-                ref_chunk = self.buffer[:cycle_len]
-                dat_chunk = self.buffer[cycle_len:block_len]
-                self.buffer = self.buffer[block_len:]
-
-                parallel_bits = []
-                for f in freqs:
-                    ref_val = self._correlate(ref_chunk, f)
-                    dat_val = self._correlate(dat_chunk, f)
-                    bit = 1 if dat_val > ref_val * threshold_ratio else 0
-                    parallel_bits.append(bit)
-                
-                self.bits.extend(parallel_bits)
-
-                if not self.sync_locked:
-                    while len(self.bits) >= 8:
-                        val = 0
-                        for i in range(8): val = (val << 1) | self.bits[i]
-                        if val == SYNC_BYTE:
-                            self.sync_locked = True
-                            for _ in range(8): self.bits.popleft()
-                            break
-                        else: self.bits.popleft()
-                else:
-                    while len(self.bits) >= 8:
-                        val = 0
-                        for i in range(8): val = (val << 1) | self.bits[i]
-                        if val == EOT_BYTE:
-                            for _ in range(8): self.bits.popleft()
-                            self.state = 'SEARCH_PILOT'
-                            self.sync_locked = False
-                            return '<EOT>'
-                        elif val in REV_CHAR_MAP:
-                            for _ in range(8): self.bits.popleft()
-                            return REV_CHAR_MAP[val]
-                        else:
-                            for _ in range(8): self.bits.popleft()
-        return None
+            self.buffer.consume(len(scores) * hop)
+
+    def _wait_pilot_end(self, cycle_len):
+        """
+        Find where the pilot stops (long window score < 0.05), then time its falloff to within
+        a few samples with a short sliding window and skip exactly the gap to the first symbol.
+        """
+        if len(self.buffer) < 3 * cycle_len: return
+        hop = max(cycle_len // PILOT_SEARCH_STEPS, 1)
+        avail = len(self.buffer)
+        scores = self._pilot_scores(cycle_len, hop)
+        gone = np.flatnonzero(scores < 0.05)
+        if not len(gone):
+            # Still inside the pilot: keep one cycle of it for timing the edge later
+            self.buffer.consume(max(len(scores) * hop - cycle_len, 0))
+            return
+
+        sr = self.sample_rate
+        edge_win = max(int(PILOT_EDGE_WINDOW * sr), 1)
+        fade_len = int(FADE_DURATION * sr)
+        gap_samples = int(GAP_DURATION * sr)
+        stop = int(gone[0]) * hop
+        lo = max(stop - cycle_len, 0)
+        hi = stop + cycle_len // 4 + edge_win
+        if avail < hi: return
+        short = self._pilot_scores(edge_win, 1, lo, hi)
+        # The short window reads half the plateau level when its centre sits mid-way through the fade-out.
+        # The first half cycle of the region is still pilot: its median is a noise-robust plateau level.
+        level = np.median(short[:max(min(stop - lo, cycle_len) // 2, 1)])
+        half = np.flatnonzero(short >= level / 2)
+        pilot_end = lo + int(half[-1]) + edge_win // 2 + fade_len // 2
+        if self.buffer.position + pilot_end - self._pilot_seen < PILOT_MIN_DURATION * sr:
+            # Too short for a pilot (e.g. the closing beep of a message)
+            self.buffer.consume(pilot_end)
+            self.state = 'SEARCH_PILOT'
+            return
+        if avail < pilot_end + gap_samples: return
+        self.buffer.consume(pilot_end + gap_samples)
+        self.payload_start = self.buffer.position
+        self.state = 'DECODE'
+        self.sync_locked = False
+        self._hunted_bits = 0
+        self._symbols_done = 0
+
+    def _decode(self, cycle_len):
+        block_len = cycle_len * 2
+        threshold_ratio = 0.85 if self.current_speed == 5 else 0.8
+        tracks = self.current_tracks
+
+        # Demodulate every complete symbol in the buffer at once and frame all their bits together
+        n_symbols = len(self.buffer) // block_len
+        # Fractional cycles: block_len is the shortest symbol, so the estimate can be one or two too many
+        while n_symbols and self._symbols_span(n_symbols) > len(self.buffer): n_symbols -= 1
+        if not self.sync_locked:
+            # While hunting for SYNC, never demodulate past the timeout: a pilot may follow a false trigger
+            n_symbols = min(n_symbols, max(-(-(SYNC_TIMEOUT_BITS + 1 - self._hunted_bits) // tracks), 1))
+        if not n_symbols: return []
+        new_bits = self._symbol_bits(n_symbols, threshold_ratio).ravel()
+        pending = len(self.bits)
+        hunting = not self.sync_locked
+        tokens, used = self._frame(np.concatenate((self.bits, new_bits)))
+        if hunting and not self.sync_locked:
+            self._hunted_bits += len(new_bits)
+            if self._hunted_bits > SYNC_TIMEOUT_BITS:
+                # No SYNC after the pilot: false trigger, go back to pilot search
+                self.state = 'SEARCH_PILOT'
+                self.bits = _NO_BITS
+        # Stop after the symbol carrying EOT so the audio behind it goes back to pilot search
+        if used is not None: n_symbols = max(-(-(used - pending) // tracks), 0)
+        self.buffer.consume(self._symbols_span(n_symbols))
+        self._symbols_done += n_symbols
+        if used is not None: self.payload_end = self.buffer.position
+        return tokens
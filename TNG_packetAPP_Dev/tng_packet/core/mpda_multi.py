@@ -0,0 +1,412 @@
+"""
+Multi-channel MPDA reception: several MPDA signals at different audio offsets decoded from one input
+(MPDAMultiReceiver), or one signal of unknown tracks / speed (MPDAAutoReceiver).
+All channels share one filter-bank front end; each channel keeps its own state machine and output queue.
+"""
+
+import numpy as np
+from collections import deque
+from tng_packet.core.dsp import as_float
+from tng_packet.core.mpda_core import MPDAReceiver, SAMPLE_RATE, PILOT_FREQ, SYNC_BYTE, VARICODE_BYTE, _NO_BITS
+
+# Front end: cumulative mixer sums are stored every FRONTEND_DECIMATION samples,
+# for FRONTEND_SECONDS of history, and input is mixed FRONTEND_BLOCK samples at a time.
+FRONTEND_DECIMATION = 4
+FRONTEND_SECONDS = 2.0
+FRONTEND_BLOCK = 8192
+# Auto-detection: every supported (tracks, speed), and the SYNC bytes a candidate must see in a row
+# to decode (one byte is too easy to hit by chance with this many candidates hunting at once)
+AUTO_CANDIDATES = tuple((tracks, speed) for tracks in (1, 4, 8) for speed in (5, 10, 20))
+AUTO_SYNC_BYTES = 2
+# Candidates are compared on the first bytes of the payload, which every frame starts with
+# (legacy: SYNC x3, varicode: SYNC x2 + VARICODE_BYTE): bit errors against them, at most AUTO_PREAMBLE_ERRORS
+AUTO_PREAMBLES = (np.unpackbits(np.array([SYNC_BYTE] * 3, dtype=np.uint8)),
+                  np.unpackbits(np.array([SYNC_BYTE, SYNC_BYTE, VARICODE_BYTE], dtype=np.uint8)))
+AUTO_PREAMBLE_BITS = 24
+AUTO_PREAMBLE_ERRORS = 6
+# A candidate whose weakest track (mean reference-cycle level) is below this fraction of the best candidate's
+# is reading tracks that aren't there
+AUTO_TRACK_LEVEL = 0.4
+# Once locked: back to pilot search when over AUTO_MAX_INVALID of the codes framed are no character
+# (checked from AUTO_CHECK_CODES codes on): a wrong lock would otherwise run until a random EOT
+AUTO_CHECK_CODES = 8
+AUTO_MAX_INVALID = 0.4
+
+class FilterBankFrontEnd:
+    """
+    Shared sliding-DFT filter bank. Input is mixed down once per registered frequency and the
+    running sums are kept on a decimated grid, so the correlation of ANY window with ANY registered
+    frequency is the difference of two stored values, whatever the channel's own timing is.
+    """
+    def __init__(self, decimation=FRONTEND_DECIMATION, seconds=FRONTEND_SECONDS, sample_rate=SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self.decimation = decimation
+        self.capacity = int(seconds * sample_rate) // decimation + 1
+        self.freqs = np.zeros(0)
+        self.acc = np.zeros((0, self.capacity), dtype=np.complex128)
+        self.base = 0       # grid index of acc column 0 (grid point g is sample g * decimation)
+        self.count = 1      # valid columns
+        self.end = 0        # absolute number of samples written
+        self.overflows = 0
+        self._running = np.zeros(0, dtype=np.complex128)
+        self._osc = np.zeros((0, 0), dtype=np.complex128)
+
+    @property
+    def first(self):
+        """Oldest absolute sample still covered by the stored sums."""
+        return self.base * self.decimation
+
+    def row(self, freq):
+        """Row index of freq in the bank, registering it on first use."""
+        hit = np.flatnonzero(self.freqs == freq)
+        if len(hit): return int(hit[0])
+        self.freqs = np.append(self.freqs, float(freq))
+        self.acc = np.vstack((self.acc, np.zeros((1, self.capacity), dtype=np.complex128)))
+        self._running = np.append(self._running, 0j)
+        self._osc = np.zeros((0, 0), dtype=np.complex128)
+        return len(self.freqs) - 1
+
+    def _oscillators(self, n):
+        if self._osc.shape[0] != len(self.freqs) or self._osc.shape[1] < n:
+            k = np.arange(max(n, FRONTEND_BLOCK))
+            self._osc = np.exp(-2j * np.pi * np.multiply.outer(self.freqs, k) / self.sample_rate)
+        return self._osc[:, :n]
+
+    def write(self, samples, keep_from=None):
+        """Mix and integrate samples into the bank. History before absolute sample keep_from may be released."""
+        n = len(samples)
+        if not n or not len(self.freqs):
+            self.end += n
+            return
+        d = self.decimation
+        k0 = self.end
+        # Phase of every mixer at sample k0, kept exact for integer Hz by reducing modulo the sample rate
+        phase = np.exp(-2j * np.pi * np.mod(self.freqs * k0, self.sample_rate) / self.sample_rate)
+        mixed = self._oscillators(n) * phase[:, None]
+        mixed *= samples
+        csum = np.cumsum(mixed, axis=1)
+        csum += self._running[:, None]
+        self._running = csum[:, -1].copy()
+        # csum[:, j] is the sum up to sample k0 + j + 1: keep the grid points
+        cols = np.arange(k0 // d + 1, (k0 + n) // d + 1) * d - k0 - 1
+        self._append(csum[:, cols], keep_from)
+        self.end += n
+
+    def _append(self, cols, keep_from):
+        m = cols.shape[1]
+        if self.count + m > self.capacity:
+            keep_g = self.base + self.count if keep_from is None else keep_from // self.decimation
+            shift = min(max(keep_g - self.base, 0), self.count - 1)
+            if self.count - shift + m > self.capacity:
+                # Slowest channel is too far behind: drop its history
+                shift = self.count + m - self.capacity
+                self.overflows += 1
+            c = self.count - shift
+            origin = self.acc[:, shift:shift+1].copy()
+            self.acc[:, :c] = self.acc[:, shift:self.count]
+            # Re-base so the stored sums stay small no matter how long we run
+            self.acc[:, :c] -= origin
+            cols = cols - origin
+            self._running -= origin[:, 0]
+            self.base += shift
+            self.count = c
+        self.acc[:, self.count:self.count+m] = cols
+        self.count += m
+
+    def window_sums(self, rows, starts, window):
+        """Complex correlation sums, shape (len(rows), len(starts)), of windows [start, start + window)."""
+        d = self.decimation
+        starts = np.asarray(starts)
+        a = np.clip(np.rint(starts / d).astype(np.intp) - self.base, 0, self.count - 1)
+        b = np.clip(np.rint((starts + window) / d).astype(np.intp) - self.base, 0, self.count - 1)
+        # Gather only the needed columns (indexing the rows first would copy the whole history)
+        rows = np.asarray(rows)[:, None]
+        return self.acc[rows, b] - self.acc[rows, a]
+
+class _FrontEndCursor:
+    """Read cursor of one channel into the shared front end (takes the place of the receiver's RingBuffer)."""
+    def __init__(self, frontend):
+        self.frontend = frontend
+        self.pos = frontend.end
+        self.underruns = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return self.frontend.end - self.pos
+
+    @property
+    def position(self):
+        return self.pos
+
+    def consume(self, n):
+        if n > len(self):
+            self.underruns += 1
+            n = len(self)
+        self.pos += n
+        return n
+
+    def clear(self):
+        self.pos = self.frontend.end
+
+    def sync(self):
+        """Jump over history the front end had to drop."""
+        first = self.frontend.first
+        if self.pos < first:
+            self.dropped += first - self.pos
+            self.pos = first
+
+    def stats(self):
+        return {'capacity': (self.frontend.capacity - 1) * self.frontend.decimation, 'fill': len(self),
+                'overflows': self.frontend.overflows, 'underruns': self.underruns, 'dropped': self.dropped}
+
+class MPDAChannel(MPDAReceiver):
+    """
+    One MPDA decoder at an audio offset (Hz) from the standard frequency plan.
+    Runs the MPDAReceiver state machine, but all correlations are read from the shared front end.
+    """
+    def __init__(self, frontend, offset=0, tracks=4, speed=10):
+        self.frontend = frontend
+        self.offset = offset
+        self.queue = deque()
+        super().__init__(tracks, speed, frontend.sample_rate)
+
+    def reset(self):
+        self.state = 'IDLE'
+        self.buffer = _FrontEndCursor(self.frontend)
+        self.bits = _NO_BITS
+        self.sync_locked = False
+        self.encoding = None
+        self.codes_read = self.codes_invalid = 0
+        self.templates = {}
+        self.payload_start = None
+        self.payload_end = None
+        self._symbols_done = 0
+
+    def _get_frequencies(self, tracks):
+        return [f + self.offset for f in super()._get_frequencies(tracks)]
+
+    def _precompute_templates(self, tracks, speed):
+        self.cycle_len = int(self.sample_rate / speed)
+        self.pilot_row = self.frontend.row(PILOT_FREQ + self.offset)
+        self.track_rows = [self.frontend.row(f) for f in self._get_frequencies(tracks)]
+
+    def process_audio(self, audio_chunk):
+        raise TypeError('MPDAChannel is fed by MPDAMultiReceiver.process_audio')
+
+    def seek(self, position, state='SEARCH_PILOT'):
+        """
+        Drop the current state and restart at absolute sample `position`: searching for a pilot,
+        or (state='DECODE') hunting SYNC in a payload that starts there.
+        """
+        self.buffer.pos = max(position, self.frontend.first)
+        self.state = state
+        self.bits = _NO_BITS
+        self.sync_locked = False
+        if state == 'DECODE':
+            self.payload_start = position
+            self._hunted_bits = 0
+            self._symbols_done = 0
+
+    def poll(self):
+        """Advance the state machine over newly written audio; decoded tokens also go to self.queue."""
+        self.buffer.sync()
+        tokens = self._run_states()
+        self.queue.extend(tokens)
+        return tokens
+
+    def _pilot_scores(self, window, hop, start=0, stop=None):
+        if stop is None: stop = len(self.buffer)
+        if stop - start < window: return np.zeros(0)
+        starts = self.buffer.pos + start + np.arange(0, stop - start - window + 1, hop)
+        return np.abs(self.frontend.window_sums([self.pilot_row], starts, window)[0]) / window
+
+    def _symbol_levels(self, n_symbols):
+        """(reference, data) cycle levels, each (tracks, n_symbols), of the next n_symbols symbols."""
+        c = self.cycle_len
+        starts = self.buffer.pos + self._cycle_starts(n_symbols)[:-1]
+        energies = np.abs(self.frontend.window_sums(self.track_rows, starts, c)) / c
+        return energies[:, 0::2], energies[:, 1::2]
+
+    def _symbol_bits(self, n_symbols, threshold_ratio):
+        ref, dat = self._symbol_levels(n_symbols)
+        return (dat > ref * threshold_ratio).T.astype(np.uint8)
+
+class _Candidate(MPDAChannel):
+    """
+    MPDAAutoReceiver hypothesis: an MPDAChannel that also keeps, from the payload start, the first
+    AUTO_PREAMBLE_BITS bits and the reference level of every track, and holds its tokens until chosen.
+    """
+    def hunt(self, position):
+        self.seek(position, 'DECODE')
+        self.preamble = _NO_BITS
+        self.levels = np.zeros(len(self.track_rows))
+        self.scored = 0
+        self.tokens = []
+
+    @property
+    def errors(self):
+        """Bit errors so far against the closer of AUTO_PREAMBLES."""
+        n = len(self.preamble)
+        return min(int(np.count_nonzero(self.preamble != p[:n])) for p in AUTO_PREAMBLES)
+
+    @property
+    def complete(self):
+        return len(self.preamble) >= AUTO_PREAMBLE_BITS
+
+    @property
+    def level(self):
+        """Mean reference level of the weakest track (an empty track of a wider plan reads noise)."""
+        return float(self.levels.min()) / self.scored if self.scored else 0.0
+
+    def _symbol_bits(self, n_symbols, threshold_ratio):
+        ref, dat = self._symbol_levels(n_symbols)
+        bits = (dat > ref * threshold_ratio).T.astype(np.uint8)
+        if not self.complete:
+            k = min(n_symbols, -(-(AUTO_PREAMBLE_BITS - len(self.preamble)) // len(self.track_rows)))
+            self.preamble = np.concatenate((self.preamble, bits[:k].ravel()))[:AUTO_PREAMBLE_BITS]
+            self.levels += ref[:, :k].sum(axis=1)
+            self.scored += k
+        return bits
+
+class MPDAMultiReceiver:
+    """Decodes several MPDA channels (audio offsets in Hz) from one input stream at sample_rate."""
+    def __init__(self, offsets=(0,), tracks=4, speed=10, sample_rate=SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self.dtype = np.dtype(np.float32)
+        # Channels take their rate from the front end
+        self.frontend = FilterBankFrontEnd(sample_rate=sample_rate)
+        self.channels = []
+        for offset in offsets: self.add_channel(offset, tracks, speed)
+
+    def add_channel(self, offset, tracks=4, speed=10):
+        channel = MPDAChannel(self.frontend, offset, tracks, speed)
+        self.channels.append(channel)
+        return channel
+
+    def remove_channel(self, channel):
+        self.channels.remove(channel)
+
+    def process_audio(self, audio_chunk):
+        """Feed audio once for all channels; returns the tokens decoded per channel (same order as self.channels)."""
+        results = [[] for _ in self.channels]
+        # int16 / float32 input is fine; the bank's running sums stay complex128 (they span seconds)
+        audio_chunk = as_float(audio_chunk)
+        for i in range(0, len(audio_chunk), FRONTEND_BLOCK):
+            piece = audio_chunk[i:i+FRONTEND_BLOCK]
+            piece = piece - np.mean(piece)
+            keep_from = min((ch.buffer.pos for ch in self.channels), default=None)
+            self.frontend.write(piece, keep_from)
+            for tokens, channel in zip(results, self.channels):
+                tokens.extend(channel.poll())
+        return results
+
+class MPDAAutoReceiver:
+    """
+    Receiver that finds tracks and speed by itself. The pilot and the payload start don't depend on
+    either, so one scout channel does the pilot search; at each payload start every AUTO_CANDIDATES channel
+    starts decoding on the shared front end (a candidate costs a few window lookups per symbol, not
+    another pass over the audio). All are scored over the same span, the frame's first AUTO_PREAMBLE_BITS
+    bits: a candidate is shed when it has more bit errors than AUTO_PREAMBLE_ERRORS or than a candidate that
+    has read the whole span, when its weakest track is below AUTO_TRACK_LEVEL of the best candidate's, or
+    when it gives up on SYNC without a character. Once every survivor has read the span, the one with the
+    fewest errors (then the strongest weakest track) wins and decodes the message alone until its EOT; it
+    is dropped back to pilot search if more than AUTO_MAX_INVALID of its codes are no character.
+    Exposes the MPDAReceiver attributes the modem and batch decoder use (state, payload_start, payload_end, buffer).
+    """
+    def __init__(self, candidates=AUTO_CANDIDATES, sample_rate=SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self.dtype = np.dtype(np.float32)
+        self.frontend = FilterBankFrontEnd(sample_rate=sample_rate)
+        # The pilot edge is timed over a region that grows with the cycle: the fastest speed times it best
+        self.scout = MPDAChannel(self.frontend, 0, 1, max(speed for _, speed in candidates))
+        self.candidates = []
+        for tracks, speed in candidates:
+            channel = _Candidate(self.frontend, 0, tracks, speed)
+            channel.sync_bytes = AUTO_SYNC_BYTES
+            channel.queue = deque(maxlen=0)  # tokens are returned by process_audio only
+            self.candidates.append(channel)
+        self.scout.queue = deque(maxlen=0)
+        self.hunting = []
+        self.locked = None
+        self.current = None  # channel of the current / last decoded message
+        self.unlocks = 0     # locks dropped for too many invalid codes
+        self.in_message = False
+
+    @property
+    def detected(self):
+        """(tracks, speed) of the current / last message, None before the first lock."""
+        return (self.current.current_tracks, self.current.current_speed) if self.current else None
+
+    @property
+    def encoding(self):
+        return self.current.encoding if self.current else None
+
+    @property
+    def state(self):
+        if self.locked: return self.locked.state
+        return 'DETECT' if self.hunting else self.scout.state
+
+    @property
+    def payload_start(self):
+        return self.current.payload_start if self.current else None
+
+    @property
+    def payload_end(self):
+        return self.current.payload_end if self.current else None
+
+    @property
+    def buffer(self):
+        return (self.current or self.scout).buffer
+
+    def get_buffer_stats(self):
+        return self.buffer.stats()
+
+    def process_audio(self, audio_chunk):
+        """Feed audio; returns the list of every character (and '<EOT>') decoded by this call."""
+        tokens = []
+        audio_chunk = as_float(audio_chunk)
+        for i in range(0, len(audio_chunk), FRONTEND_BLOCK):
+            piece = audio_chunk[i:i+FRONTEND_BLOCK]
+            piece = piece - np.mean(piece)
+            live = [self.locked] if self.locked else [self.scout] + self.hunting
+            self.frontend.write(piece, min(c.buffer.pos for c in live))
+            got = self._detect() if self.locked is None else self.locked.poll()
+            tokens.extend(got)
+            if got: self.in_message = got[-1] != '<EOT>'
+            if self.locked is not None and (self.locked.state != 'DECODE' or self._garbled(self.locked)):
+                # EOT, SYNC timeout or a wrong lock: back to pilot search from where it stopped
+                if self.locked.state == 'DECODE':
+                    self.unlocks += 1
+                    # Close the message a wrong lock has started so consumers don't merge it with the next
+                    if self.in_message: tokens.append('<EOT>')
+                self.in_message = False
+                self.scout.seek(self.locked.buffer.pos)
+                self.locked = None
+        return tokens
+
+    @staticmethod
+    def _garbled(channel):
+        return channel.codes_read >= AUTO_CHECK_CODES and channel.codes_invalid > AUTO_MAX_INVALID * channel.codes_read
+
+    def _detect(self):
+        self.scout.poll()
+        if self.scout.state == 'DECODE':
+            # New payload (a pilot during a hunt also restarts it): every candidate starts from it
+            start = self.scout.payload_start
+            for channel in self.candidates: channel.hunt(start)
+            self.hunting = list(self.candidates)
+            self.scout.seek(self.scout.buffer.pos)
+        if not self.hunting: return []
+        for channel in self.hunting: channel.tokens.extend(channel.poll())
+        # A wrong speed can read the preamble as SYNC and the next cycles as EOT: only a character counts
+        live = [c for c in self.hunting
+                if c.state == 'DECODE' or c.complete and any(t != '<EOT>' for t in c.tokens)]
+        limit = min([AUTO_PREAMBLE_ERRORS] + [c.errors for c in live if c.complete])
+        self.hunting = [c for c in live if c.errors <= limit]
+        if not self.hunting or not all(c.complete for c in self.hunting): return []
+        best_level = max(c.level for c in self.hunting)
+        winner = min((c for c in self.hunting if c.level >= AUTO_TRACK_LEVEL * best_level),
+                     key=lambda c: (c.errors, -c.level))
+        self.locked = self.current = winner
+        self.hunting = []
+        return winner.tokens
@@ -0,0 +1,168 @@
+import numpy as np
+
+class RingBuffer:
+    """
+    Fixed-capacity circular sample buffer with a read cursor.
+    Storage is mirrored (every sample is written twice, capacity apart), so any window of
+    up to `capacity` unread samples is a contiguous zero-copy view: see peek().
+    Views stay valid until the region is overwritten by later writes.
+    """
+    def __init__(self, capacity, dtype=np.float64):
+        self.capacity = int(capacity)
+        self.dtype = np.dtype(dtype)
+        self._data = np.zeros(self.capacity * 2, dtype=self.dtype)
+        self._read = 0
+        self._count = 0
+        self.position = 0    # absolute index of the next unread sample (everything consumed or dropped so far)
+        self.overflows = 0   # writes that had to drop unread samples
+        self.underruns = 0   # reads/consumes asking for more than was available
+        self.dropped = 0     # total samples lost to overflow or keep_last()
+
+    def __len__(self):
+        return self._count
+
+    def free(self):
+        return self.capacity - self._count
+
+    def clear(self):
+        self.position += self._count
+        self._read = 0
+        self._count = 0
+
+    def write(self, samples):
+        """Append samples, dropping the oldest unread ones if full. Returns the number dropped."""
+        samples = np.asarray(samples)
+        cap = self.capacity
+        n = len(samples)
+        dropped = 0
+        if n > cap:
+            # Larger than the whole ring: everything unread and the head of the block is lost
+            dropped = self._count + n - cap
+            self.position += dropped
+            self._read = self._count = 0
+            samples = samples[-cap:]; n = cap
+        excess = self._count + n - cap
+        if excess > 0:
+            self._read = (self._read + excess) % cap
+            self._count -= excess
+            self.position += excess
+            dropped += excess
+        if n:
+            w = (self._read + self._count) % cap
+            first = min(n, cap - w)
+            self._data[w:w+first] = samples[:first]
+            self._data[w+cap:w+cap+first] = samples[:first]
+            rest = n - first
+            if rest:
+                self._data[:rest] = samples[first:]
+                self._data[cap:cap+rest] = samples[first:]
+            self._count += n
+        if dropped:
+            self.overflows += 1
+            self.dropped += dropped
+        return dropped
+
+    def peek(self, n=None, offset=0):
+        """Contiguous view of n unread samples starting `offset` past the read cursor (no copy)."""
+        avail = self._count - offset
+        if n is None: n = avail
+        if n > avail or offset < 0:
+            self.underruns += 1
+            n = max(avail, 0)
+        start = self._read + offset
+        return self._data[start:start+n]
+
+    def consume(self, n):
+        """Advance the read cursor by n samples. Returns the number actually consumed."""
+        if n > self._count:
+            self.underruns += 1
+            n = self._count
+        self._read = (self._read + n) % self.capacity
+        self._count -= n
+        self.position += n
+        return n
+
+    def keep_last(self, n):
+        """Discard all but the newest n unread samples."""
+        excess = self._count - n
+        if excess > 0:
+            self.consume(excess)
+            self.dropped += excess
+
+    def stats(self):
+        return {'capacity': self.capacity, 'fill': self._count, 'overflows': self.overflows,
+                'underruns': self.underruns, 'dropped': self.dropped}
+
+class SharedRingBuffer:
+    """
+    Single-writer, multi-reader circular buffer (mirrored storage like RingBuffer).
+    Every reader has its own cursor and reads zero-copy views at its own pace; the writer never
+    waits, so a reader that falls more than `capacity` behind skips ahead and counts an overflow.
+    """
+    def __init__(self, capacity, dtype=np.float32):
+        self.capacity = int(capacity)
+        self.dtype = np.dtype(dtype)
+        self._data = np.zeros(self.capacity * 2, dtype=self.dtype)
+        self.end = 0  # absolute number of samples written
+
+    def write(self, samples):
+        samples = np.asarray(samples)
+        cap = self.capacity
+        if len(samples) > cap:
+            self.end += len(samples) - cap
+            samples = samples[-cap:]
+        n = len(samples)
+        if not n: return
+        w = self.end % cap
+        first = min(n, cap - w)
+        self._data[w:w+first] = samples[:first]
+        self._data[w+cap:w+cap+first] = samples[:first]
+        rest = n - first
+        if rest:
+            self._data[:rest] = samples[first:]
+            self._data[cap:cap+rest] = samples[first:]
+        # Publish only after the data is in place
+        self.end += n
+
+    def reader(self, from_start=False):
+        return SharedRingReader(self, 0 if from_start else self.end)
+
+class SharedRingReader:
+    """Read cursor into a SharedRingBuffer."""
+    def __init__(self, ring, position):
+        self.ring = ring
+        self.position = position
+        self.overflows = 0
+        self.dropped = 0
+
+    def __len__(self):
+        self._catch_up()
+        return self.ring.end - self.position
+
+    def _catch_up(self):
+        behind = self.ring.end - self.position - self.ring.capacity
+        if behind > 0:
+            self.position += behind
+            self.overflows += 1
+            self.dropped += behind
+
+    def peek(self, n=None):
+        """Contiguous view of up to n unread samples (no copy)."""
+        avail = len(self)
+        n = avail if n is None else min(n, avail)
+        start = self.position % self.ring.capacity
+        return self.ring._data[start:start+n]
+
+    def consume(self, n):
+        self.position += min(n, len(self))
+
+    def read(self, n=None):
+        view = self.peek(n)
+        self.position += len(view)
+        return view
+
+    def skip_to_end(self):
+        self.position = self.ring.end
+
+    def stats(self):
+        return {'capacity': self.ring.capacity, 'fill': len(self), 'overflows': self.overflows, 'dropped': self.dropped}
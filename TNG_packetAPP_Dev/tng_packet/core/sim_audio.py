@@ -0,0 +1,217 @@
+"""
+Simulated sound card with the subset of the sounddevice API the app uses (InputStream, OutputStream,
+CallbackStop/CallbackAbort, query_devices, default). Everything played on an OutputStream is mixed,
+passed through a Channel (noise, offset, drift, fading: see tng_packet.core.channel) and delivered to
+every open InputStream, so the transmitter is heard by the receiver without any audio hardware.
+
+The card runs on a virtual clock. With speed=None it steps as fast as the CPU allows; speed=1.0 is
+wall-clock pace (the default for the app). With auto=False no thread is started and the caller drives
+the clock with run(seconds), e.g. hours of simulated traffic from a test script:
+
+    card = sim_audio.card(); card.configure(speed=None, auto=False, snr_db=0, fading_hz=0.3)
+    ... open streams (AudioMonitor / ModemEngine with the 'sim' backend) ...
+    card.run(3600)
+
+The app reads TNG_SIM_SPEED ('max' or a factor) and TNG_SIM_CHANNEL ('snr_db=6,freq_offset=3') on first use.
+"""
+
+import os
+import threading
+import time as _time
+from time import perf_counter
+
+import numpy as np
+
+from tng_packet.core.channel import Channel
+from tng_packet.core.dsp import as_float, to_int16
+from tng_packet.core.mpda_core import SAMPLE_RATE
+
+BLOCK = 1024
+DEVICES = [{'name': 'TNG Sim Loopback', 'index': 0, 'hostapi': 0, 'max_input_channels': 1, 'max_output_channels': 1,
+            'default_samplerate': float(SAMPLE_RATE), 'default_low_input_latency': BLOCK / SAMPLE_RATE,
+            'default_low_output_latency': BLOCK / SAMPLE_RATE, 'default_high_input_latency': BLOCK / SAMPLE_RATE,
+            'default_high_output_latency': BLOCK / SAMPLE_RATE}]
+DTYPES = ('float32', 'float64', 'int16')
+
+class CallbackStop(Exception): pass
+class CallbackAbort(Exception): pass
+class PortAudioError(Exception): pass
+
+class default:
+    device = [0, 0]
+    samplerate = SAMPLE_RATE
+
+def query_devices(device=None, kind=None):
+    if device is None and kind is None: return list(DEVICES)
+    return DEVICES[0]
+
+class _Time:
+    """Stand-in for the callback `time` struct: perf_counter() now, buffer times one block away."""
+    __slots__ = ('currentTime', 'inputBufferAdcTime', 'outputBufferDacTime')
+
+    def __init__(self, latency):
+        now = perf_counter()
+        self.currentTime = now
+        self.inputBufferAdcTime = now - latency
+        self.outputBufferDacTime = now + latency
+
+class SimCard:
+    """The virtual card: a clock, the mix of every playing output and the channel to the inputs."""
+    def __init__(self, sample_rate=SAMPLE_RATE, block=BLOCK, speed=1.0, auto=True, channel=None):
+        self.sample_rate = sample_rate
+        self.block = block
+        self.speed = speed
+        self.auto = auto
+        self.channel = channel or Channel(sample_rate=sample_rate)
+        self._channel_options = {}
+        self.frames = 0
+        self._streams = []
+        self._lock = threading.RLock()
+        self._thread = None
+
+    @classmethod
+    def from_env(cls):
+        speed = os.environ.get('TNG_SIM_SPEED', '1')
+        options = {}
+        for item in filter(None, os.environ.get('TNG_SIM_CHANNEL', '').split(',')):
+            key, value = item.split('=')
+            options[key.strip()] = float(value)
+        card = cls(speed=None if speed == 'max' else float(speed))
+        card.configure(**options)
+        return card
+
+    def configure(self, speed=..., auto=None, sample_rate=None, **channel_options):
+        """Change pace / driving mode / rate, and replace the channel if any Channel option is given."""
+        with self._lock:
+            if speed is not ...: self.speed = speed
+            if auto is not None: self.auto = auto
+            if channel_options: self._channel_options = channel_options
+            if sample_rate: self.sample_rate = sample_rate
+            if channel_options or sample_rate: self.channel = Channel(sample_rate=self.sample_rate, **self._channel_options)
+
+    @property
+    def seconds(self):
+        """Simulated time elapsed."""
+        return self.frames / self.sample_rate
+
+    def _attach(self, stream):
+        with self._lock:
+            if stream not in self._streams: self._streams.append(stream)
+            if self.auto and (self._thread is None or not self._thread.is_alive()):
+                self._thread = threading.Thread(target=self._loop, name='sim-audio', daemon=True)
+                self._thread.start()
+
+    def _detach(self, stream):
+        with self._lock:
+            if stream in self._streams: self._streams.remove(stream)
+
+    def step(self):
+        """Advance the clock by one block: pull every output, run the channel, push to every input."""
+        with self._lock:
+            mix = np.zeros(self.block)
+            for s in [s for s in self._streams if isinstance(s, OutputStream)]: mix += s._pull(self.block)
+            air = self.channel.process(mix)
+            for s in [s for s in self._streams if isinstance(s, InputStream)]: s._push(air)
+            self.frames += self.block
+
+    def run(self, seconds):
+        """Drive the clock for `seconds` of simulated time in the calling thread (use with auto=False)."""
+        for _ in range(int(np.ceil(seconds * self.sample_rate / self.block))): self.step()
+
+    def _loop(self):
+        t0, f0 = perf_counter(), self.frames
+        while self.auto and self._streams:
+            self.step()
+            if self.speed:
+                ahead = (self.frames - f0) / self.sample_rate / self.speed - (perf_counter() - t0)
+                if ahead > 0: _time.sleep(ahead)
+            # Unpaced: still let the consumers' threads run between blocks
+            else: _time.sleep(0)
+
+class _Stream:
+    def __init__(self, samplerate=None, blocksize=None, device=None, channels=1, dtype='float32',
+                 latency=None, callback=None, finished_callback=None, **_):
+        self.card = card()
+        # An idle card runs at whatever rate the first stream asks for
+        if samplerate and samplerate != self.card.sample_rate and not self.card._streams: self.card.configure(sample_rate=int(samplerate))
+        self.samplerate = float(samplerate or self.card.sample_rate)
+        if self.samplerate != self.card.sample_rate: raise PortAudioError(f"Invalid sample rate {samplerate} (sim card runs at {self.card.sample_rate})")
+        if dtype not in DTYPES: raise PortAudioError(f"Unsupported sample format {dtype}")
+        self.device = device
+        self.channels = channels
+        self.dtype = dtype
+        self.blocksize = blocksize or self.card.block
+        self.latency = self.blocksize / self.samplerate
+        self.callback = callback
+        self.finished_callback = finished_callback
+        self.active = False
+        self.stopped = True
+        self.closed = False
+        self._pending = np.zeros(0)
+
+    def start(self):
+        if self.closed: raise PortAudioError("Stream is closed")
+        self.active = True
+        self.stopped = False
+        self.card._attach(self)
+
+    def stop(self):
+        if self.stopped: return
+        self._finish()
+
+    abort = stop
+
+    def close(self):
+        self.stop()
+        self.closed = True
+
+    def _finish(self):
+        self.card._detach(self)
+        was_active, self.active, self.stopped = self.active, False, True
+        self._pending = np.zeros(0)
+        if was_active and self.finished_callback: self.finished_callback()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class OutputStream(_Stream):
+    def _pull(self, n):
+        # Ask the callback for whole blocks until n samples are queued; CallbackStop plays out its last block
+        finishing = False
+        while len(self._pending) < n and not finishing:
+            out = np.zeros((self.blocksize, self.channels), dtype=self.dtype)
+            try: self.callback(out, self.blocksize, _Time(self.latency), None)
+            except CallbackStop: finishing = True
+            except CallbackAbort:
+                self._finish()
+                return np.zeros(n)
+            self._pending = np.concatenate((self._pending, as_float(out[:, 0], np.float64)))
+        block, self._pending = self._pending[:n], self._pending[n:]
+        if finishing:
+            self._finish()
+            if len(block) < n: block = np.concatenate((block, np.zeros(n - len(block))))
+        return block
+
+class InputStream(_Stream):
+    def _push(self, samples):
+        self._pending = np.concatenate((self._pending, samples))
+        size = self.blocksize
+        while len(self._pending) >= size and self.active:
+            indata = np.empty((size, self.channels), dtype=self.dtype)
+            if indata.dtype == np.int16: to_int16(self._pending[:size, None], out=indata)
+            else: indata[:] = self._pending[:size, None]
+            self._pending = self._pending[size:]
+            try: self.callback(indata, size, _Time(self.latency), None)
+            except (CallbackStop, CallbackAbort): self._finish()
+
+_card = None
+
+def card():
+    """The process-wide simulated card (created from the environment on first use)."""
+    global _card
+    if _card is None: _card = SimCard.from_env()
+    return _card
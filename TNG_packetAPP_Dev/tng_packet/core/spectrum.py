@@ -0,0 +1,188 @@
+import math
+import numpy as np
+
+FFT_SIZES = (1024, 2048, 4096, 8192, 16384)
+AVERAGING_MODES = ('none', 'exp', 'peak')
+
+# Spectra handed out by an engine live in a pool of this many rows, reused round-robin
+OUTPUT_SLOTS = 32
+
+# Window and bin-frequency arrays per (size, sample rate), shared by every engine
+_WINDOWS = {}
+_FREQS = {}
+
+# NumPy >= 2.0 can write rfft results into a preallocated array
+try:
+    np.fft.rfft(np.zeros(2), out=np.empty(2, dtype=np.complex128))
+    _RFFT_OUT = True
+except TypeError:
+    _RFFT_OUT = False
+
+def window(size):
+    if size not in _WINDOWS:
+        w = np.hanning(size)
+        w.setflags(write=False)
+        _WINDOWS[size] = w
+    return _WINDOWS[size]
+
+def bin_freqs(size, sample_rate):
+    key = (size, sample_rate)
+    if key not in _FREQS:
+        f = np.fft.rfftfreq(size, 1.0 / sample_rate).astype(np.float32)
+        f.setflags(write=False)
+        _FREQS[key] = f
+    return _FREQS[key]
+
+def rows_per_frame(wf_speed):
+    """Waterfall row decimation for the 'wf_speed' setting (percent of spectrum frames, 100+ = every frame)."""
+    return max(1, int(round(100.0 / max(wf_speed, 1))))
+
+class SpectralEngine:
+    """
+    Sliding-window spectrum analyzer for the visual widgets.
+    Reads overlapping frames (fft_size, hop = fft_size * (1 - overlap)) straight from a ring reader,
+    averages power per bin ('none', 'exp' with factor avg_alpha, or 'peak' hold decaying by avg_alpha
+    per frame) and converts to dB once. Every `row_every`-th frame is flagged as a waterfall row, so
+    the scroll speed changes without extra FFTs.
+    All per-frame math goes into buffers allocated by configure(); returned spectra are rows of an
+    OUTPUT_SLOTS pool, valid until that many more frames have been analyzed. The window/FFT stage runs
+    in float64 (pocketfft transforms float64 straight into out=, float32 input gets a scratch copy per
+    call and is no faster); averaging and dB conversion are float32. Checked by `benchmark --sections alloc`.
+    """
+    def __init__(self, sample_rate, fft_size=1024, overlap=0.5, averaging='none', avg_alpha=0.3, row_every=1):
+        self.sample_rate = sample_rate
+        self.configure(fft_size, overlap, averaging, avg_alpha, row_every)
+
+    def configure(self, fft_size=None, overlap=None, averaging=None, avg_alpha=None, row_every=None):
+        if fft_size is not None:
+            if fft_size not in FFT_SIZES: raise ValueError(f"Unsupported FFT size: {fft_size}")
+            self.fft_size = fft_size
+            self._alloc(fft_size // 2 + 1)
+        if overlap is not None: self.overlap = min(max(float(overlap), 0.0), 0.9)
+        if averaging is not None:
+            if averaging not in AVERAGING_MODES: raise ValueError(f"Unsupported averaging: {averaging}")
+            self.averaging = averaging
+            self._primed = False
+        if avg_alpha is not None: self.avg_alpha = min(max(float(avg_alpha), 0.01), 1.0)
+        if row_every is not None: self.row_every = max(int(row_every), 1)
+        self.hop = max(int(self.fft_size * (1 - self.overlap)), 1)
+        self.window = window(self.fft_size)
+        self.freqs = bin_freqs(self.fft_size, self.sample_rate)
+        # Scale so a tone reads the same dB at every size as in the original 1024-point display
+        self._norm = (float(np.sum(self.window)) / float(np.sum(window(FFT_SIZES[0])))) ** 2
+        self._count = 0
+        self._seen = 0
+
+    def _alloc(self, bins):
+        self._frame = np.empty(self.fft_size)
+        self._spec = np.empty(bins, dtype=np.complex128)
+        self._sq = np.empty((2, bins))
+        self._power = np.empty(bins, dtype=np.float32)
+        self._tmp = np.empty(bins, dtype=np.float32)
+        self._avg = np.zeros(bins, dtype=np.float32)
+        self._out = np.empty((OUTPUT_SLOTS, bins), dtype=np.float32)
+        self._slot = 0
+        self._primed = False
+
+    def available(self, reader):
+        """Whole frames readable from reader right now."""
+        n = len(reader)
+        return 0 if n < self.fft_size else (n - self.fft_size) // self.hop + 1
+
+    def skip(self, reader, frames):
+        reader.consume(frames * self.hop)
+
+    def frames(self, reader, limit=None, step=1):
+        """
+        Yield (level dB, spectrum dB, is_row) for each whole frame in reader (at most limit).
+        With step > 1 only every step-th frame (counted across calls) is analyzed, the others are skipped.
+        """
+        count = self.available(reader)
+        if limit is not None: count = min(count, limit)
+        for _ in range(count):
+            self._seen += 1
+            if step > 1 and self._seen % step:
+                reader.consume(self.hop)
+                continue
+            chunk = reader.peek(self.fft_size)
+            reader.consume(self.hop)
+            yield self.analyze(chunk)
+
+    def analyze(self, chunk):
+        n = self.fft_size
+        level = 10 * math.log10(float(np.dot(chunk, chunk)) / n + 1e-18)
+        frame, spec, sq, power, tmp, avg = self._frame, self._spec, self._sq, self._power, self._tmp, self._avg
+        # Casts only through copyto (ufuncs with mixed dtypes allocate cast buffers)
+        np.copyto(frame, chunk)
+        frame *= self.window
+        if _RFFT_OUT: np.fft.rfft(frame, out=spec)
+        else: spec[:] = np.fft.rfft(frame)
+        np.multiply(spec.real, spec.real, out=sq[0])
+        np.multiply(spec.imag, spec.imag, out=sq[1])
+        sq[0] += sq[1]
+        np.copyto(power, sq[0])
+        if self.averaging == 'none' or not self._primed:
+            avg[:] = power
+            self._primed = True
+        elif self.averaging == 'exp':
+            np.subtract(power, avg, out=tmp)
+            tmp *= self.avg_alpha
+            avg += tmp
+        else:
+            avg *= 1.0 - self.avg_alpha
+            np.maximum(avg, power, out=avg)
+        self._count += 1
+        is_row = self._count % self.row_every == 0
+        out = self._out[self._slot]
+        self._slot = (self._slot + 1) % OUTPUT_SLOTS
+        np.multiply(avg, 1.0 / self._norm, out=out)
+        out += 1e-18
+        np.log10(out, out=out)
+        out *= 10
+        return level, out, is_row
+
+class DisplayScaler:
+    """
+    Turns a batch of dB spectra into display values in a reusable float32 work matrix:
+    (x + offset), optional clip, * gain, optional 3-tap smoothing with a cached kernel. No per-call arrays.
+    """
+    KERNEL = np.full(3, 1.0 / 3, dtype=np.float32)
+
+    def __init__(self):
+        self._work = np.empty((0, 0), dtype=np.float32)
+        self._tmp = self._acc = self._work
+
+    def load(self, spectra):
+        """Copy spectra (same length) into the work matrix; returns the (len(spectra), bins) view."""
+        k, bins = len(spectra), len(spectra[0])
+        if self._work.shape[0] < k or self._work.shape[1] != bins:
+            shape = (max(k, OUTPUT_SLOTS), bins)
+            self._work = np.empty(shape, dtype=np.float32)
+            self._tmp = np.empty(shape, dtype=np.float32)
+            self._acc = np.empty(shape, dtype=np.float32)
+        m = self._work[:k]
+        for row, spectrum in zip(m, spectra): row[:] = spectrum
+        return m
+
+    def apply(self, m, offset=0.0, gain=1.0, clip=None, smooth=False):
+        m += offset
+        if clip is not None: np.clip(m, clip[0], clip[1], out=m)
+        m *= gain
+        if smooth:
+            # 'same' convolution with zero edges, as np.convolve(x, KERNEL, mode='same')
+            k0, k1, k2 = self.KERNEL
+            t, acc = self._tmp[:len(m)], self._acc[:len(m)]
+            # Shifts on the flat rows (strided 2-D slices would go through NumPy's buffered iterator);
+            # the value carried across a row boundary is zeroed
+            mf, tf = m.reshape(-1), t.reshape(-1)
+            np.multiply(m, k1, out=acc)
+            np.multiply(mf[:-1], k0, out=tf[1:]); t[:, 0] = 0; acc += t
+            np.multiply(mf[1:], k2, out=tf[:-1]); t[:, -1] = 0; acc += t
+            m[:] = acc
+        return m
+
+def engine_options(settings):
+    """SpectralEngine.configure() arguments from the app settings."""
+    return {'fft_size': int(settings.get('fft_size', 1024)), 'overlap': settings.get('fft_overlap', 50) / 100.0,
+            'averaging': settings.get('spec_avg', 'none'), 'avg_alpha': settings.get('spec_avg_factor', 0.3),
+            'row_every': rows_per_frame(settings.get('wf_speed', 50))}
@@ -0,0 +1,73 @@
+"""
+Activity detector (squelch) run on every capture block, ahead of the spectrum and decoder stages.
+
+A block is active when it carries the MPDA pilot (single-bin DFT at PILOT_FREQ: noise alone puts about
+1/N of an N-sample block's energy in that bin, a tone about half) or when its energy is ENERGY_DB above
+the tracked noise floor (any other signal on the band). Activity holds for HANG_SECONDS after the last
+active block. Cost per block: one complex dot product and one sum of squares.
+"""
+
+import numpy as np
+
+from tng_packet.core.mpda_core import PILOT_FREQ
+
+# Pilot bin energy, in multiples of its noise-only mean, that counts as a tone (noise exceeds 12x with p = e^-12)
+TONE_FACTOR = 12.0
+ENERGY_DB = 6.0
+# The floor follows quieter blocks at once and rises this slowly (band conditions, AGC)
+FLOOR_RISE_DB_PER_SEC = 0.5
+HANG_SECONDS = 2.0
+
+class Squelch:
+    """
+    update(block, end) from the capture callback; consumers read `active` and `opened_at` (absolute
+    sample index of the first active block of the current run), or ask heard_since(position) when they
+    may have slept through a short burst. With enabled=False it is always open.
+    """
+    def __init__(self, sample_rate, freqs=(PILOT_FREQ,), hang=HANG_SECONDS, enabled=True):
+        self.sample_rate = sample_rate
+        self.freqs = tuple(freqs)
+        self.hang = int(hang * sample_rate)
+        self.enabled = enabled
+        self.floor = None
+        self.last_active = None
+        self.opened_at = None
+        self.openings = 0
+        self._osc = np.zeros((0, 0), dtype=np.complex64)
+
+    @property
+    def active(self):
+        return not self.enabled or self.opened_at is not None
+
+    def heard_since(self, position):
+        """Open now, or an active block ended after absolute sample `position`."""
+        return self.active or (self.last_active is not None and self.last_active > position)
+
+    def _oscillators(self, n):
+        if self._osc.shape[1] != n:
+            t = np.arange(n) / self.sample_rate
+            self._osc = np.exp(-2j * np.pi * np.outer(self.freqs, t)).astype(np.complex64)
+        return self._osc
+
+    def update(self, block, end):
+        """Score one block ending at absolute sample `end`; returns whether the squelch is open."""
+        n = len(block)
+        if not n: return self.active
+        x = block.astype(np.float32) if block.dtype.kind == 'i' else block
+        energy = float(np.dot(x, x))
+        tone = float(np.max(np.abs(self._oscillators(n) @ x)) ** 2) / (energy + 1e-30)
+        mean = energy / n
+        if self.floor is None or mean < self.floor: self.floor = max(mean, 1e-12)
+        else: self.floor *= 10 ** (FLOOR_RISE_DB_PER_SEC / 10 * n / self.sample_rate)
+        if tone > TONE_FACTOR or mean > self.floor * 10 ** (ENERGY_DB / 10):
+            if self.opened_at is None:
+                self.opened_at = end - n
+                self.openings += 1
+            self.last_active = end
+        elif self.opened_at is not None and end - self.last_active > self.hang:
+            self.opened_at = None
+        return self.active
+
+    def stats(self):
+        return {'enabled': self.enabled, 'active': self.active, 'openings': self.openings,
+                'floor_db': round(float(10 * np.log10(self.floor)), 1) if self.floor else None}
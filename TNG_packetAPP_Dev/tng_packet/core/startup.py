@@ -0,0 +1,67 @@
+"""
+Startup timing: milestones since launch, a first-paint budget, and an optional import-time profile.
+
+    python launcher.py --profile-startup     (or TNG_PROFILE_STARTUP=1)
+
+prints the slowest first-time imports and which heavy modules were already loaded at first paint.
+"""
+
+import builtins
+import os
+import sys
+from time import perf_counter
+
+# Window must be painted within this many seconds of launch
+STARTUP_BUDGET_SECONDS = 1.5
+HEAVY_MODULES = ('numpy', 'pyqtgraph', 'sounddevice', 'scipy')
+PROFILE_TOP = 15
+
+_T0 = perf_counter()
+_marks = []
+_imports = {}
+_orig_import = None
+_loaded_at_paint = ()
+
+def mark(name):
+    """Record a milestone (seconds since launch)."""
+    _marks.append((name, perf_counter() - _T0))
+
+def elapsed():
+    return perf_counter() - _T0
+
+def profiling_requested(argv=None):
+    argv = sys.argv if argv is None else argv
+    return '--profile-startup' in argv or os.environ.get('TNG_PROFILE_STARTUP') == '1'
+
+def enable_import_profile():
+    """Time every first import (inclusive of its own imports) from now on."""
+    global _orig_import
+    if _orig_import is not None: return
+    _orig_import = builtins.__import__
+
+    def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules: return _orig_import(name, globals, locals, fromlist, level)
+        t = perf_counter()
+        try: return _orig_import(name, globals, locals, fromlist, level)
+        finally: _imports.setdefault(name, perf_counter() - t)
+
+    builtins.__import__ = _timed_import
+
+def report(out=None):
+    """Print milestones, the budget verdict and (if enabled) the import profile. Returns True if within budget."""
+    out = out or sys.stdout
+    paint = dict(_marks).get('first_paint')
+    ok = paint is not None and paint <= STARTUP_BUDGET_SECONDS
+    out.write("Startup: " + " | ".join(f"{name} {t:.2f}s" for name, t in _marks) +
+              f" (first paint budget {STARTUP_BUDGET_SECONDS:.1f}s: {'OK' if ok else 'OVER'})\n")
+    if _orig_import is not None:
+        out.write(f"  loaded at first paint: {', '.join(m for m in HEAVY_MODULES if m in _loaded_at_paint) or 'none of ' + ', '.join(HEAVY_MODULES)}\n")
+        for name, t in sorted(_imports.items(), key=lambda kv: -kv[1])[:PROFILE_TOP]:
+            out.write(f"  {t * 1000:8.1f} ms  {name}\n")
+    return ok
+
+def first_paint():
+    """Call once when the main window has been painted."""
+    global _loaded_at_paint
+    mark('first_paint')
+    _loaded_at_paint = tuple(m for m in HEAVY_MODULES if m in sys.modules)
@@ -0,0 +1,65 @@
+import numpy as np
+
+class WaterfallBuffer:
+    """
+    Scrolling waterfall history without np.roll. Rows are quantized to uint8 colour indices when
+    written (levels applied once per row) and stored mirrored like RingBuffer, so view() is always
+    a contiguous (history, bins) array, oldest row first, that ImageItem can wrap as an indexed
+    QImage with a LUT: no copy and no re-levelling of old rows. Writing is O(bins).
+    Changing the levels only affects rows written afterwards.
+    """
+    def __init__(self, history, bins, levels=(0.0, 80.0)):
+        self.history = int(history)
+        self.bins = int(bins)
+        self._data = np.zeros((self.history * 2, self.bins), dtype=np.uint8)
+        self._scratch = np.empty(self.bins, dtype=np.float32)
+        self._batch = np.empty((0, self.bins), dtype=np.float32)
+        self._write = 0
+        self.rows_written = 0
+        self.set_levels(*levels)
+
+    def set_levels(self, low, high):
+        self.levels = (float(low), float(high))
+        self._scale = 255.0 / max(high - low, 1e-9)
+
+    def clear(self):
+        self._data[:] = 0
+        self._write = 0
+
+    def push(self, row):
+        """Quantize one spectrum row (dB values, len >= bins) and append it as the newest row."""
+        s = self._scratch
+        np.subtract(row[:self.bins], self.levels[0], out=s)
+        s *= self._scale
+        np.clip(s, 0, 255, out=s)
+        w = self._write
+        self._data[w] = s
+        self._data[w + self.history] = self._data[w]
+        self._write = (w + 1) % self.history
+        self.rows_written += 1
+
+    def push_rows(self, rows):
+        """Append a batch of rows (oldest first) with one quantization pass and at most two block copies."""
+        rows = rows[-self.history:]
+        k = len(rows)
+        if not k: return
+        if len(self._batch) < k: self._batch = np.empty((max(k, 32), self.bins), dtype=np.float32)
+        q = self._batch[:k]
+        np.subtract(rows[:, :self.bins], self.levels[0], out=q)
+        q *= self._scale
+        np.clip(q, 0, 255, out=q)
+        h, w = self.history, self._write
+        first = min(k, h - w)
+        self._data[w:w+first] = q[:first]
+        self._data[w+h:w+h+first] = q[:first]
+        rest = k - first
+        if rest:
+            self._data[:rest] = q[first:]
+            self._data[h:h+rest] = q[first:]
+        self._write = (w + k) % h
+        self.rows_written += k
+
+    def view(self):
+        """Contiguous (history, bins) uint8 view, oldest row first (no copy)."""
+        w = self._write
+        return self._data[w:w + self.history]
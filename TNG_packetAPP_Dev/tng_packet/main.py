@@ -1,16 +1,27 @@
 import sys
+from tng_packet.core import startup
+if startup.profiling_requested(): startup.enable_import_profile()
 from PyQt6.QtWidgets import QApplication
 from tng_packet.ui.main_window import MainWindow
 from tng_packet.core.settings import load_settings
 
 def main():
+    startup.mark('imports')
+    if '--sim-audio' in sys.argv:
+        from tng_packet.core import audio_backend
+        audio_backend.use('sim')
+    if '--metrics' in sys.argv:
+        from tng_packet.core import metrics
+        metrics.enable()
     app = QApplication(sys.argv)
     app.setStyle('Fusion')
 
     # Load Settings
     settings = load_settings()
 
+    # Window first; audio, plots and the modem are loaded after its first paint
     window = MainWindow(settings)
+    startup.mark('window_built')
     window.show()
 
     sys.exit(app.exec())
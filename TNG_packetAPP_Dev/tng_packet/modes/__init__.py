@@ -1,12 +1,90 @@
+"""
+모드 레지스트리. 모드는 import 하지 않고 찾기만 하며, 선택될 때 처음으로 로드합니다.
+
+찾는 곳:
+  - 이 폴더의 mode_*.py 파일 (NAME / VERSION 은 소스를 파싱해서 읽음, 실행하지 않음)
+  - 설치된 패키지의 'tng_packet.modes' entry point (name = 모드 이름, value = 'module:Class')
+새 모드는 mode_xxx.py 파일에 BaseModem 하위 클래스 하나를 만들면 자동으로 등록됩니다.
+"""
+
+import ast
+import importlib
+import os
+from importlib.metadata import entry_points
+
 from .base import BaseModem
 
-# 나중에 여기에 새로 만든 모드 파일들을 import 하세요
-# from .mode_chirp import ChirpModem 
+ENTRY_POINT_GROUP = 'tng_packet.modes'
+
+class ModeInfo:
+    """등록된 모드 하나. load() 전에는 모듈을 import 하지 않습니다."""
+    def __init__(self, name, target, version='', source='builtin'):
+        self.name = name
+        self.target = target  # 'package.module:Class'
+        self.version = version
+        self.source = source
+        self._cls = None
+
+    @property
+    def loaded(self):
+        return self._cls is not None
+
+    def load(self):
+        if self._cls is None:
+            module, _, attr = self.target.partition(':')
+            self._cls = getattr(importlib.import_module(module), attr)
+        return self._cls
+
+    def create(self, **options):
+        return self.load()(**options)
+
+    def __repr__(self):
+        return f"ModeInfo({self.name!r}, {self.target!r}, loaded={self.loaded})"
+
+_REGISTRY = None
+
+def _scan_modes_dir():
+    found = []
+    folder = os.path.dirname(os.path.abspath(__file__))
+    for fname in sorted(os.listdir(folder)):
+        if not (fname.startswith('mode_') and fname.endswith('.py')): continue
+        try:
+            with open(os.path.join(folder, fname), 'r', encoding='utf-8') as f: tree = ast.parse(f.read(), fname)
+        except (OSError, SyntaxError) as e:
+            print(f"Skipping mode file {fname}: {e}")
+            continue
+        for node in tree.body:
+            if not isinstance(node, ast.ClassDef): continue
+            attrs = {t.id: s.value.value for s in node.body if isinstance(s, ast.Assign) and isinstance(s.value, ast.Constant)
+                     for t in s.targets if isinstance(t, ast.Name)}
+            if 'NAME' in attrs:
+                found.append(ModeInfo(attrs['NAME'], f"{__name__}.{fname[:-3]}:{node.name}", str(attrs.get('VERSION', ''))))
+    return found
+
+def _scan_entry_points():
+    try: eps = entry_points(group=ENTRY_POINT_GROUP)
+    except Exception as e:
+        print(f"Mode entry point scan failed: {e}")
+        return []
+    return [ModeInfo(ep.name, ep.value, source='entry_point') for ep in eps]
+
+def discover(refresh=False):
+    """이름 -> ModeInfo. 결과는 캐시되며 refresh=True 로 다시 찾습니다 (내장 모드가 우선)."""
+    global _REGISTRY
+    if _REGISTRY is None or refresh:
+        registry = {}
+        for info in _scan_entry_points() + _scan_modes_dir(): registry[info.name] = info
+        _REGISTRY = registry
+    return _REGISTRY
 
 def get_available_modes():
     """
-    사용 가능한 모든 모드 클래스를 리스트로 반환합니다.
+    사용 가능한 모든 모드를 ModeInfo 리스트로 반환합니다 (아직 import 하지 않음).
     """
-    modes = []
-    # modes.append(ChirpModem())
-    return modes
+    return list(discover().values())
+
+def load_mode(name, **options):
+    """이름으로 모드를 로드(처음 한 번만 import)하고 인스턴스를 만들어 반환합니다."""
+    modes = discover()
+    if name not in modes: raise KeyError(f"Unknown mode: {name} (available: {', '.join(sorted(modes))})")
+    return modes[name].create(**options)
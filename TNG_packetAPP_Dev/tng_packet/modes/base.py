@@ -1,7 +1,15 @@
+import numpy as np
+
 class BaseModem:
     """
     모든 통신 모드가 상속받아야 할 기본 클래스입니다.
     새로운 패킷을 만들 때는 이 클래스를 복사해서 쓰세요.
+
+    스트리밍 계약 (메모리 사용량이 메시지 길이와 무관해야 합니다):
+      - feed(samples) -> events : 수신 오디오 블록을 넣으면 이번에 디코딩된 이벤트 리스트를 반환
+        (이벤트 = 문자 한 개, 또는 '<EOT>' 같은 '<...>' 표식)
+      - iter_modulate(text, block_size) -> blocks : 송신 오디오를 block_size 샘플씩 yield
+    modulate / demodulate 는 위 두 메서드로 기본 구현되어 있으니 스트리밍 쪽만 구현해도 됩니다.
     """
     NAME = "Unknown"
     VERSION = "0.0"
@@ -9,14 +17,52 @@ class BaseModem:
     def __init__(self, sample_rate=48000):
         self.sr = sample_rate
 
+    def configure(self, **options):
+        """모드별 옵션 변경 (예: MPDA tracks/speed). 기본은 아무것도 하지 않습니다."""
+
+    def reset(self):
+        """수신 상태 초기화."""
+
+    def stats(self):
+        return {}
+
+    def busy(self):
+        """
+        수신 중인 메시지가 있으면 True. False 인 동안은 스켈치가 닫히면 feed() 호출을 멈출 수 있습니다
+        (다시 열릴 때 그 직전 오디오부터 이어서 들어옴). 기본은 항상 True (재우지 않음).
+        """
+        return True
+
+    def feed(self, samples):
+        """
+        [수신-스트리밍] 오디오 블록을 받아 이번 호출에서 디코딩된 이벤트 리스트를 반환해야 합니다.
+        """
+        raise NotImplementedError("스트리밍 수신 기능이 구현되지 않았습니다.")
+
+    def iter_modulate(self, text, block_size=1024):
+        """
+        [송신-스트리밍] float32 오디오 블록(block_size 샘플, 마지막 블록은 0으로 채움)을 순서대로 yield 해야 합니다.
+        기본 구현은 modulate() 결과를 잘라서 보냅니다.
+        """
+        if type(self).modulate is BaseModem.modulate:
+            raise NotImplementedError("송신 기능이 구현되지 않았습니다.")
+        signal = np.asarray(self.modulate(text), dtype=np.float32)
+        for i in range(0, len(signal), block_size):
+            block = signal[i:i+block_size]
+            if len(block) < block_size: block = np.concatenate((block, np.zeros(block_size - len(block), dtype=np.float32)))
+            yield block
+
     def modulate(self, text):
         """
         [송신] 텍스트를 입력받아 오디오 샘플(numpy array)을 반환해야 합니다.
         """
-        raise NotImplementedError("송신 기능이 구현되지 않았습니다.")
+        if type(self).iter_modulate is BaseModem.iter_modulate:
+            raise NotImplementedError("송신 기능이 구현되지 않았습니다.")
+        blocks = list(self.iter_modulate(text))
+        return np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.float32)
 
     def demodulate(self, audio_samples):
         """
         [수신] 오디오 샘플을 받아 텍스트를 반환해야 합니다.
         """
-        raise NotImplementedError("수신 기능이 구현되지 않았습니다.")
+        return ''.join(e for e in self.feed(audio_samples) if not (e.startswith('<') and e.endswith('>') and len(e) > 1))
@@ -0,0 +1,77 @@
+from tng_packet.modes.base import BaseModem
+from tng_packet.core.dsp import Resampler
+from tng_packet.core.mpda_core import MPDATransmitter, MPDAReceiver, SAMPLE_RATE, ENCODINGS
+from tng_packet.core.mpda_multi import MPDAAutoReceiver
+
+class MPDAModem(BaseModem):
+    """
+    MPDA (다중 트랙 진폭 변조) 모드. mpda_core 송수신기를 BaseModem 스트리밍 계약으로 감쌉니다.
+    sample_rate 는 장치 샘플레이트(송신 합성과 feed 입력). rx_rate 를 주면 수신은 폴리페이즈
+    리샘플러를 거쳐 그 샘플레이트(예: 11025)에서 디코딩합니다. 기본은 입력 그대로.
+    auto=True 면 수신은 상대 국의 트랙/속도를 스스로 찾습니다(MPDAAutoReceiver). tracks/speed 는 송신에만 쓰입니다.
+    encoding 은 송신 페이로드 부호화('legacy' 8비트 / 'varicode'). 수신은 프레임마다 헤더로 알아서 구분합니다.
+    """
+    NAME = "MPDA"
+    VERSION = "4.1"
+
+    def __init__(self, sample_rate=SAMPLE_RATE, tracks=4, speed=10, rx_rate=None, auto=False, encoding='legacy'):
+        super().__init__(sample_rate)
+        if encoding not in ENCODINGS: raise ValueError(f"Unsupported encoding: {encoding}")
+        self.tracks = tracks
+        self.speed = speed
+        self.auto = auto
+        self.encoding = encoding
+        self.rx_rate = rx_rate or sample_rate
+        self.transmitter = MPDATransmitter(sample_rate)
+        self._receiver = None
+        self._resampler = None
+
+    @property
+    def receiver(self):
+        # 송신 전용 인스턴스는 수신 버퍼를 만들지 않도록 처음 쓸 때 생성
+        if self._receiver is None:
+            if self.auto: self._receiver = MPDAAutoReceiver(sample_rate=self.rx_rate)
+            else: self._receiver = MPDAReceiver(self.tracks, self.speed, self.rx_rate)
+            if self.rx_rate != self.sr: self._resampler = Resampler(self.sr, self.rx_rate, dtype=self._receiver.dtype)
+        return self._receiver
+
+    def configure(self, tracks=None, speed=None, auto=None, encoding=None, **options):
+        if encoding is not None and encoding not in ENCODINGS: raise ValueError(f"Unsupported encoding: {encoding}")
+        self.tracks = tracks or self.tracks
+        self.speed = speed or self.speed
+        self.encoding = encoding or self.encoding
+        if auto is not None and auto != self.auto:
+            self.auto = auto
+            self.reset()
+        # 설정이 실제로 바뀔 때만: configure 는 수신 중인 메시지를 버림 (encoding 은 송신 전용)
+        elif self._receiver is not None and not self.auto and \
+                (self.tracks, self.speed) != (self._receiver.current_tracks, self._receiver.current_speed):
+            self._receiver.configure(self.tracks, self.speed)
+
+    def reset(self):
+        self._receiver = None
+        self._resampler = None
+
+    def stats(self):
+        # 통계 조회만으로 수신기(10 초 링 버퍼)를 만들지 않음: 송신 전용 인스턴스는 IDLE
+        receiver = self._receiver
+        if receiver is None:
+            return {'state': 'IDLE', 'rx_rate': self.rx_rate, 'detected': None, 'encoding': None, 'decoder': {}}
+        return {'state': receiver.state, 'rx_rate': self.rx_rate, 'detected': receiver.detected if self.auto else None,
+                'encoding': receiver.encoding,
+                'decoder': receiver.get_buffer_stats()}
+
+    def busy(self):
+        # 파일럿 탐색 중에는 쉬어도 됨: 파일럿이 오면 스켈치가 열림
+        return self._receiver is not None and self._receiver.state not in ('IDLE', 'SEARCH_PILOT')
+
+    def feed(self, samples):
+        receiver = self.receiver
+        if self._resampler is not None: samples = self._resampler.process(samples)
+        return receiver.process_audio(samples)
+
+    def iter_modulate(self, text, block_size=1024):
+        return self.transmitter.iter_signal(text, self.tracks, self.speed, block_size, self.encoding)
+
+    def modulate(self, text):
+        return self.transmitter.generate_signal(text, self.tracks, self.speed, self.encoding)
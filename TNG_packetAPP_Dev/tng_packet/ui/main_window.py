@@ -1,11 +1,13 @@
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-                             QLabel, QPushButton, QComboBox, QTextEdit, QSplitter, QFrame, QApplication, QSlider, QGridLayout, QLineEdit)
+                             QLabel, QPushButton, QComboBox, QTextEdit, QSplitter, QFrame, QApplication, QSlider, QGridLayout, QLineEdit,
+                             QFileDialog)
 from PyQt6.QtCore import Qt, QTimer, QTime
 from tng_packet.core.theme_manager import ThemeManager
-from tng_packet.ui.settings_dialog import SettingsDialog
 from tng_packet.core.settings import save_settings
 from tng_packet.core.i18n import Translator
-from tng_packet.ui.visual_widget import VisualWidget
+from tng_packet.core import startup, metrics
+# Plots (pyqtgraph), audio (sounddevice/numpy) and the settings dialog are imported on demand:
+# the window is painted first, see _start_backend()
 
 class MainWindow(QMainWindow):
     def __init__(self, settings):
@@ -16,11 +18,46 @@ class MainWindow(QMainWindow):
         self.resize(1280, 800)
         self.timer = QTimer(self); self.timer.timeout.connect(self.update_status); self.timer.start(1000)
         self.is_tx_enabled = False
+        self.modem = None
+        self.visuals = None
+        if self.settings.get('metrics'): metrics.enable()
+        self._painted = False
         self.init_ui()
 
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self._painted:
+            self._painted = True; startup.first_paint()
+            QTimer.singleShot(0, self._start_backend)
+
+    def _start_backend(self):
+        from tng_packet.core.audio_stream import AudioMonitor
+        from tng_packet.core.modem_engine import ModemEngine
+        from tng_packet.core.mpda_core import SAMPLE_RATE
+        # One modem for the whole session; init_ui() may rebuild the widgets (language change)
+        monitor = AudioMonitor.shared(self.settings.get('audio_in_idx'), self.settings.get('sample_rate', SAMPLE_RATE),
+                                      self.settings.get('sample_format', 'float32'))
+        self.modem = ModemEngine(monitor, 'MPDA', self.settings.get('audio_out_idx'),
+                                 speed=self.settings.get('speed', 10), encoding=self.settings.get('encoding', 'legacy'),
+                                 **self._track_options(self.track_combo.currentIndex()))
+        self.modem.text_received.connect(self.on_rx_text)
+        self.modem.tx_finished.connect(self.on_tx_finished)
+        self.modem.start()
+        self._attach_visuals()
+        startup.mark('backend_ready')
+        if startup.profiling_requested(): startup.report()
+
+    def _attach_visuals(self):
+        from tng_packet.ui.visual_widget import VisualWidget
+        self.visuals = VisualWidget(self.settings)
+        self.visual_slot.layout().addWidget(self.visuals)
+        self.visuals.start()
+
     def init_ui(self):
         self.setWindowTitle(f"TNG_PacketAPP - MPDA v4.1.0 [{self.settings.get('callsign', 'NOCALL')}]")
-        if self.centralWidget(): self.centralWidget().deleteLater()
+        if self.centralWidget():
+            if self.visuals: self.visuals.stop()
+            self.centralWidget().deleteLater()
         central = QWidget(); self.setCentralWidget(central)
         main_layout = QVBoxLayout(central)
         main_layout.setContentsMargins(0,0,0,0); main_layout.setSpacing(0)
@@ -35,7 +72,9 @@ class MainWindow(QMainWindow):
         self.top_qso = QFrame(); qso_layout = QGridLayout(self.top_qso); qso_layout.setContentsMargins(5,5,5,5)
         self.txt_dx_call = QLineEdit(); self.txt_dx_call.setPlaceholderText("DX CALL")
         self.txt_rst_s = QLineEdit("599"); self.txt_rst_s.setFixedWidth(60)
-        self.track_combo = QComboBox(); self.track_combo.addItems(["4 Tracks", "8 Tracks"])
+        self.track_combo = QComboBox(); self.track_combo.addItems(["4 Tracks", "8 Tracks", "Auto RX"])
+        if self.modem: self.track_combo.setCurrentIndex(2 if self.modem.options.get('auto') else 1 if self.modem.options.get('tracks') == 8 else 0)
+        self.track_combo.currentIndexChanged.connect(self.on_mode_changed)
         qso_layout.addWidget(QLabel("DX Call:"), 0, 0); qso_layout.addWidget(self.txt_dx_call, 0, 1)
         qso_layout.addWidget(QLabel("RST:"), 0, 2); qso_layout.addWidget(self.txt_rst_s, 0, 3)
         qso_layout.addWidget(self.track_combo, 0, 4)
@@ -71,8 +110,9 @@ class MainWindow(QMainWindow):
         right_layout.setContentsMargins(0, 0, 0, 0); right_layout.setSpacing(0)
         self.rx_text = QTextEdit(); self.rx_text.setReadOnly(True); self.rx_text.setPlaceholderText("RX Stream...")
         right_layout.addWidget(self.rx_text, stretch=3)
-        self.visuals = VisualWidget(self.settings)
-        right_layout.addWidget(self.visuals, stretch=2)
+        # Spectrum/waterfall go here once the backend is up
+        self.visual_slot = QFrame(); slot_layout = QVBoxLayout(self.visual_slot); slot_layout.setContentsMargins(0, 0, 0, 0)
+        right_layout.addWidget(self.visual_slot, stretch=2)
         
         self.splitter.addWidget(left_panel); self.splitter.addWidget(right_panel)
         self.splitter.setStretchFactor(0, 3); self.splitter.setStretchFactor(1, 4)
@@ -80,7 +120,7 @@ class MainWindow(QMainWindow):
         
         self._create_menu()
         ThemeManager.apply_theme(QApplication.instance(), self)
-        self.visuals.start()
+        if self.modem: self._attach_visuals()
 
     def apply_style(self):
         # This method is called by ThemeManager to apply window-specific styles
@@ -104,18 +144,49 @@ class MainWindow(QMainWindow):
         f = mb.addMenu(Translator.tr("menu_file"))
         f.addAction(Translator.tr("menu_settings"), self.open_settings)
         f.addAction(Translator.tr("menu_exit"), self.close)
-        mb.addMenu(Translator.tr("menu_view"))
+        v = mb.addMenu(Translator.tr("menu_view"))
+        act = v.addAction(Translator.tr("menu_metrics")); act.setCheckable(True); act.setChecked(metrics.enabled())
+        act.toggled.connect(self.on_metrics_toggled)
+        v.addAction(Translator.tr("menu_export_metrics"), self.export_metrics)
         mb.addMenu(Translator.tr("menu_help"))
 
     def on_tx_clicked(self, checked):
-        if checked: self.btn_tx.setText("TX ENABLED"); self.is_tx_enabled = True; self.btn_tune.setChecked(False)
-        else: self.btn_tx.setText("Enable TX"); self.is_tx_enabled = False
-    def on_halt_clicked(self): self.btn_tx.setChecked(False); self.btn_tx.setText("Enable TX"); self.btn_tune.setChecked(False); self.is_tx_enabled = False
+        if checked and self.modem and self.modem.transmit(self.msg_input.toPlainText(), self.slider_pwr.value() / 100.0):
+            self.btn_tx.setText("TX ENABLED"); self.is_tx_enabled = True; self.btn_tune.setChecked(False)
+        else: self.btn_tx.setChecked(False); self.btn_tx.setText("Enable TX"); self.is_tx_enabled = False; self.halt_modem()
+    def on_halt_clicked(self): self.halt_modem(); self.btn_tx.setChecked(False); self.btn_tx.setText("Enable TX"); self.btn_tune.setChecked(False); self.is_tx_enabled = False
     def on_tune_clicked(self, checked): 
-        if checked and self.btn_tx.isChecked(): self.btn_tx.setChecked(False); self.btn_tx.setText("Enable TX")
-    def update_status(self): self.status_bar.setText(f"UTC: {QTime.currentTime().toString('HH:mm:ss')} | Mode: MPDA | Status: Ready")
+        if checked and self.btn_tx.isChecked(): self.halt_modem(); self.btn_tx.setChecked(False); self.btn_tx.setText("Enable TX")
+    def on_tx_finished(self): self.btn_tx.setChecked(False); self.btn_tx.setText("Enable TX"); self.is_tx_enabled = False
+    def halt_modem(self):
+        if self.modem: self.modem.halt()
+    @staticmethod
+    def _track_options(idx):
+        # Auto RX: the receiver finds tracks/speed itself, TX stays on 4 tracks
+        return {'tracks': 8 if idx == 1 else 4, 'auto': idx == 2}
+    def on_mode_changed(self, idx):
+        if self.modem: self.modem.configure(speed=self.settings.get('speed', 10), encoding=self.settings.get('encoding', 'legacy'), **self._track_options(idx))
+    def on_rx_text(self, text):
+        cursor = self.rx_text.textCursor(); cursor.movePosition(cursor.MoveOperation.End); cursor.insertText(text)
+        self.rx_text.setTextCursor(cursor)
+    def update_status(self):
+        if self.modem is None: self.status_bar.setText(f"UTC: {QTime.currentTime().toString('HH:mm:ss')} | Mode: MPDA | Status: starting"); return
+        status = "TX" if self.modem.transmitting else "RX"
+        st = self.modem.stats(); rx_l = st['rx_latency'].get('mean_ms'); tx_l = st['tx_latency'].get('last_ms')
+        lat = "".join([f" | RX lat: {rx_l:.0f} ms" if rx_l is not None else "", f" | TX lat: {tx_l:.0f} ms" if tx_l is not None else ""])
+        det = st['rx'].get('detected'); mode = f"MPDA (auto {det[0]}T/{det[1]})" if det else "MPDA"
+        self.status_bar.setText(f"UTC: {QTime.currentTime().toString('HH:mm:ss')} | Mode: {mode} | Status: {status}{lat}{metrics.status_text()}")
+
+    def on_metrics_toggled(self, on):
+        metrics.enable(on); self.settings['metrics'] = on
+    def export_metrics(self):
+        path, _ = QFileDialog.getSaveFileName(self, Translator.tr("menu_export_metrics"), "tng_metrics.json", "JSON (*.json);;Text (*.txt)")
+        if path:
+            try: metrics.export(path)
+            except OSError as e: print(f"Metrics export error: {e}")
 
     def open_settings(self):
+        from tng_packet.ui.settings_dialog import SettingsDialog
         dlg = SettingsDialog(self, self.settings)
         if dlg.exec():
             new_s = dlg.get_settings()
@@ -124,6 +195,11 @@ class MainWindow(QMainWindow):
             save_settings(self.settings)
             if lang_changed: Translator.load(self.settings.get('lang', 'en')); self.init_ui()
             else: ThemeManager.apply_theme(QApplication.instance(), self)
-            self.visuals.refresh_settings()
+            if self.visuals: self.visuals.refresh_settings()
+            if self.modem: self.modem.output_device = self.settings.get('audio_out_idx')
+            self.on_mode_changed(self.track_combo.currentIndex())
     
-    def closeEvent(self, event): self.visuals.stop(); save_settings(self.settings); super().closeEvent(event)
+    def closeEvent(self, event):
+        if self.visuals: self.visuals.stop()
+        if self.modem: self.modem.stop()
+        save_settings(self.settings); super().closeEvent(event)
@@ -0,0 +1,59 @@
+import numpy as np
+from PyQt6.QtCore import QObject, QTimer
+from tng_packet.core import metrics
+
+DEFAULT_FPS = 25
+
+class RenderScheduler(QObject):
+    """
+    Repaints a plot widget at a fixed frame rate instead of once per audio block.
+    Every tick calls `paint()` once, which should collect everything produced since the last tick;
+    ticks are skipped while the widget is hidden or its window is minimized.
+    """
+    def __init__(self, widget, paint, fps=DEFAULT_FPS):
+        super().__init__(widget)
+        self.widget = widget
+        self.paint = paint
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self._tick)
+        self.frames_painted = 0
+        self.ticks_skipped = 0
+        self._m_frame = metrics.histogram('render.frame_ms')
+        self._m_skipped = metrics.counter('render.skipped')
+        self.set_fps(fps)
+
+    def set_fps(self, fps):
+        self.fps = max(int(fps), 1)
+        self.timer.setInterval(int(1000 / self.fps))
+
+    def start(self):
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+
+    def is_showing(self):
+        w = self.widget
+        return w.isVisible() and not w.window().isMinimized()
+
+    def _tick(self):
+        if not self.is_showing():
+            self.ticks_skipped += 1
+            self._m_skipped.inc()
+            return
+        with self._m_frame.time(): painted = self.paint() is not False
+        if painted: self.frames_painted += 1
+
+def visible_curve(freqs, mag, max_freq, width, out=None):
+    """
+    Clip a spectrum to [0, max_freq] and, if it has more bins than `width` pixels,
+    reduce it to about one point per pixel keeping the peak of each group (tones stay visible).
+    The reduced curve is written to `out` when given (len(out) >= len(mag) // 2).
+    """
+    n = int(np.searchsorted(freqs, max_freq, side='right'))
+    freqs, mag = freqs[:n], mag[:n]
+    step = n // max(int(width), 1)
+    if step < 2: return freqs, mag
+    m = n // step * step
+    if out is not None: out = out[:m // step]
+    return freqs[:m:step], np.max(mag[:m].reshape(-1, step), axis=1, out=out)
@@ -2,7 +2,25 @@ from PyQt6.QtWidgets import (QDialog, QTabWidget, QWidget, QVBoxLayout, QHBoxLay
                              QLabel, QLineEdit, QComboBox, QGroupBox, QPushButton, QSpinBox, QDoubleSpinBox, QCheckBox, QSlider)
 from PyQt6.QtCore import Qt
 from tng_packet.core.i18n import Translator
-import sounddevice as sd
+from tng_packet.core.spectrum import FFT_SIZES, AVERAGING_MODES
+from tng_packet.core.dsp import SAMPLE_FORMATS
+from tng_packet.core.mpda_core import ENCODINGS
+
+# Capture / modem rates offered for the device (applied at the next start, like the sample format)
+SAMPLE_RATES = (44100, 48000)
+
+# Audio devices, enumerated on first use and kept for the process (reopening the dialog doesn't
+# re-enumerate PortAudio); the Refresh button clears it
+_devices = None
+
+def _query_devices(refresh=False):
+    global _devices
+    if _devices is None or refresh:
+        try:
+            from tng_packet.core import audio_backend
+            _devices = list(audio_backend.get().query_devices())
+        except Exception: _devices = []
+    return _devices
 
 class SettingsDialog(QDialog):
     def __init__(self, parent=None, settings=None):
@@ -71,7 +89,15 @@ class SettingsDialog(QDialog):
         self.combo_in = QComboBox(); self.combo_out = QComboBox()
         self._populate_audio_devices()
         l_aud.addWidget(QLabel(Translator.tr("lbl_in"))); l_aud.addWidget(self.combo_in)
-        l_aud.addWidget(QLabel(Translator.tr("lbl_out"))); l_aud.addWidget(self.combo_out)
+        l_aud.addWidget(QLabel(Translator.tr("lbl_out")))
+        r_out = QHBoxLayout(); r_out.addWidget(self.combo_out, stretch=1)
+        self.btn_refresh = QPushButton(Translator.tr("btn_refresh")); self.btn_refresh.clicked.connect(self._refresh_audio_devices)
+        r_out.addWidget(self.btn_refresh); l_aud.addLayout(r_out)
+        self.combo_rate = QComboBox(); self.combo_rate.addItems([str(r) for r in SAMPLE_RATES]); self.combo_rate.setCurrentText(str(self.settings.get('sample_rate', SAMPLE_RATES[0])))
+        l_aud.addWidget(QLabel(Translator.tr("lbl_rate"))); l_aud.addWidget(self.combo_rate)
+        self.combo_format = QComboBox(); self.combo_format.addItems(SAMPLE_FORMATS); self.combo_format.setCurrentText(self.settings.get('sample_format', SAMPLE_FORMATS[0]))
+        l_aud.addWidget(QLabel(Translator.tr("lbl_format"))); l_aud.addWidget(self.combo_format)
+        self.chk_squelch = QCheckBox(Translator.tr("lbl_squelch")); self.chk_squelch.setChecked(self.settings.get('squelch', True)); l_aud.addWidget(self.chk_squelch)
         layout.addWidget(grp_aud); layout.addStretch()
 
     def _build_transmit_tab(self):
@@ -82,7 +108,9 @@ class SettingsDialog(QDialog):
         self.chk_beeps = QCheckBox(Translator.tr("lbl_beeps")); self.chk_beeps.setChecked(self.settings.get('enable_beeps', True)); l_mpda.addWidget(self.chk_beeps)
         self.txt_start_beep = QLineEdit(self.settings.get('start_beep', '250:400:250')); self.txt_end_beep = QLineEdit(self.settings.get('end_beep', '250:400:250'))
         l_mpda.addWidget(QLabel(Translator.tr("lbl_start_beep"))); l_mpda.addWidget(self.txt_start_beep)
-        l_mpda.addWidget(QLabel(Translator.tr("lbl_end_beep"))); l_mpda.addWidget(self.txt_end_beep); l_mpda.addStretch()
+        l_mpda.addWidget(QLabel(Translator.tr("lbl_end_beep"))); l_mpda.addWidget(self.txt_end_beep)
+        self.combo_encoding = QComboBox(); self.combo_encoding.addItems(ENCODINGS); self.combo_encoding.setCurrentText(self.settings.get('encoding', ENCODINGS[0]))
+        l_mpda.addWidget(QLabel(Translator.tr("lbl_encoding"))); l_mpda.addWidget(self.combo_encoding); l_mpda.addStretch()
         sub_chirp = QWidget(); self.sub_tabs_tx.addTab(sub_chirp, Translator.tr("sub_chirp"))
         QVBoxLayout(sub_chirp).addWidget(QLabel("Chirp Settings"))
 
@@ -131,6 +159,19 @@ class SettingsDialog(QDialog):
         
         self.chk_fill = QCheckBox(Translator.tr("lbl_fill")); self.chk_fill.setChecked(self.settings.get('spec_fill', False))
         l_spec.addWidget(self.chk_fill)
+        
+        self.combo_fft = QComboBox(); self.combo_fft.addItems([str(n) for n in FFT_SIZES]); self.combo_fft.setCurrentText(str(self.settings.get('fft_size', 1024)))
+        l_spec.addWidget(QLabel(Translator.tr("lbl_fft_size"))); l_spec.addWidget(self.combo_fft)
+        
+        self.spin_overlap = QSpinBox(); self.spin_overlap.setRange(0, 90); self.spin_overlap.setSingleStep(25); self.spin_overlap.setValue(int(self.settings.get('fft_overlap', 50)))
+        l_spec.addWidget(QLabel(Translator.tr("lbl_overlap"))); l_spec.addWidget(self.spin_overlap)
+        
+        self.combo_avg = QComboBox(); self.combo_avg.addItems(list(AVERAGING_MODES)); self.combo_avg.setCurrentText(self.settings.get('spec_avg', 'none'))
+        self.spin_avg = QDoubleSpinBox(); self.spin_avg.setRange(0.01, 1.0); self.spin_avg.setSingleStep(0.05); self.spin_avg.setValue(float(self.settings.get('spec_avg_factor', 0.3)))
+        l_spec.addWidget(QLabel(Translator.tr("lbl_avg"))); l_spec.addWidget(self.combo_avg); l_spec.addWidget(self.spin_avg)
+        
+        self.spin_fps = QSpinBox(); self.spin_fps.setRange(1, 60); self.spin_fps.setValue(int(self.settings.get('render_fps', 25)))
+        l_spec.addWidget(QLabel(Translator.tr("lbl_fps"))); l_spec.addWidget(self.spin_fps)
         l_spec.addStretch()
 
     def _build_log_tab(self):
@@ -147,31 +188,41 @@ class SettingsDialog(QDialog):
         l_tx.addStretch()
         sub_mail = QWidget(); self.sub_tabs_macro.addTab(sub_mail, Translator.tr("sub_email"))
 
+    def _refresh_audio_devices(self):
+        _query_devices(refresh=True)
+        self._populate_audio_devices()
+
     def _populate_audio_devices(self):
         try:
-            devices = sd.query_devices()
+            # Keep the current choice across a refresh (the saved one on first fill)
+            cur_in = self.combo_in.currentText() or self.settings.get('audio_in'); cur_out = self.combo_out.currentText() or self.settings.get('audio_out')
+            devices = _query_devices()
             unique_in = set(); unique_out = set(); self.combo_in.clear(); self.combo_out.clear()
             for d in devices:
                 name = d['name']
                 if d['max_input_channels']>0 and name not in unique_in: self.combo_in.addItem(name); unique_in.add(name)
                 if d['max_output_channels']>0 and name not in unique_out: self.combo_out.addItem(name); unique_out.add(name)
-            if self.settings.get('audio_in'): self.combo_in.setCurrentText(self.settings.get('audio_in'))
-            if self.settings.get('audio_out'): self.combo_out.setCurrentText(self.settings.get('audio_out'))
+            if cur_in: self.combo_in.setCurrentText(cur_in)
+            if cur_out: self.combo_out.setCurrentText(cur_out)
         except: pass
 
     def get_settings(self):
         lang_rev = {'English':'en','Korean':'ko','Japanese':'jp'}
         in_n = self.combo_in.currentText(); out_n = self.combo_out.currentText(); in_i = None; out_i = None
-        try: devs = sd.query_devices(); in_i = next((i for i,d in enumerate(devs) if d['name']==in_n),None); out_i = next((i for i,d in enumerate(devs) if d['name']==out_n),None)
+        try: devs = _query_devices(); in_i = next((i for i,d in enumerate(devs) if d['name']==in_n),None); out_i = next((i for i,d in enumerate(devs) if d['name']==out_n),None)
         except: pass
         return {
             'callsign': self.txt_call.text().upper(), 'grid': self.txt_grid.text().upper(),
             'theme': 'dark', 'lang': lang_rev.get(self.combo_lang.currentText(),'en'),
             'audio_in': in_n, 'audio_in_idx': in_i, 'audio_out': out_n, 'audio_out_idx': out_i,
+            'sample_rate': int(self.combo_rate.currentText()), 'sample_format': self.combo_format.currentText(),
+            'squelch': self.chk_squelch.isChecked(),
             'wf_speed': self.spin_wf_speed.value(), 'colormap': self.combo_cmap.currentText(),
             'max_freq': self.spin_maxf.value(), 'drange': self.spin_drange.value(), 'wf_smooth': self.chk_smooth.isChecked(),
             'spec_gain': self.spin_spec_gain.value(), 'ref_level': self.spin_ref_lvl.value(),
             'spec_line_width': self.spin_line_width.value(), 'spec_fill': self.chk_fill.isChecked(),
-            'enable_beeps': self.chk_beeps.isChecked(), 'start_beep': self.txt_start_beep.text(), 'end_beep': self.txt_end_beep.text(),
+            'fft_size': int(self.combo_fft.currentText()), 'fft_overlap': self.spin_overlap.value(),
+            'spec_avg': self.combo_avg.currentText(), 'spec_avg_factor': self.spin_avg.value(), 'render_fps': self.spin_fps.value(),
+            'enable_beeps': self.chk_beeps.isChecked(), 'encoding': self.combo_encoding.currentText(), 'start_beep': self.txt_start_beep.text(), 'end_beep': self.txt_end_beep.text(),
             'log_timestamp': self.chk_ts.isChecked(), 'log_font_size': self.spin_font.value()
         }
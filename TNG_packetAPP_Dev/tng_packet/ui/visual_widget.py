@@ -2,7 +2,11 @@ import numpy as np
 import pyqtgraph as pg
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QProgressBar, QLabel, QFrame
 from PyQt6.QtCore import Qt, QRectF
-from tng_packet.core.audio_stream import AudioMonitor
+from tng_packet.core.audio_stream import AudioMonitor, SpectrumWorker
+from tng_packet.core import metrics
+from tng_packet.core.waterfall import WaterfallBuffer
+from tng_packet.core.spectrum import engine_options, bin_freqs, DisplayScaler
+from tng_packet.ui.render_scheduler import RenderScheduler, visible_curve, DEFAULT_FPS
 
 class VisualWidget(QWidget):
     def __init__(self, settings):
@@ -36,21 +40,30 @@ class VisualWidget(QWidget):
         self.plot_wf.showAxis('bottom', False); self.plot_wf.showAxis('left', False)
         self.plot_wf.setXRange(0, 3000)
         self.plot_wf.hideButtons(); self.plot_wf.setMouseEnabled(x=False, y=False)
-        self.img_wf = pg.ImageItem()
-        # Fix Flickering & Aliasing: set pxMode=False (better scaling)
-        self.img_wf.setOptions(pxMode=False)
+        # Row-major uint8 image + LUT: the waterfall ring view is wrapped as an indexed QImage without copies
+        self.img_wf = pg.ImageItem(axisOrder='row-major')
         self.plot_wf.addItem(self.img_wf)
-        self.hist = pg.HistogramLUTItem(); self.hist.setImageItem(self.img_wf)
+        # Only the gradient is used (colormap presets -> LUT); no histogram pass over the image
+        self.hist = pg.HistogramLUTItem()
         graph_layout.addWidget(self.plot_wf)
         
         self.layout.addLayout(graph_layout)
         
-        self.monitor = AudioMonitor(self.settings.get('audio_in_idx'))
-        self.monitor.data_signal.connect(self.update_data)
+        self.monitor = AudioMonitor.shared(self.settings.get('audio_in_idx'))
+        self.worker = SpectrumWorker(self.monitor, parent=self)
+        self.scheduler = RenderScheduler(self, self.update_data, self.settings.get('render_fps', DEFAULT_FPS))
         self.history_len = 300
-        self.wf_data = np.zeros((self.history_len, 513))
+        self.waterfall = None
+        self.display = DisplayScaler()
+        self._m_waterfall = metrics.histogram('render.waterfall_ms')
+        self._curve = np.empty(0, dtype=np.float32)
         self.refresh_settings()
 
+    def _reset_waterfall(self, bins):
+        self.waterfall = WaterfallBuffer(self.history_len, bins, levels=(0, self.settings.get('drange', 60.0) + 20))
+        self.img_wf.setImage(self.waterfall.view(), autoLevels=False)
+        self.img_wf.setRect(QRectF(0, 0, self.monitor.view_rate / 2, self.history_len))
+
     def refresh_settings(self):
         # Style
         self.meters_frame.setStyleSheet("background-color: #2b2b2b; color: #aaa; border-right: 1px solid #444;")
@@ -73,52 +86,53 @@ class VisualWidget(QWidget):
         cmap = self.settings.get('colormap', 'magma')
         try: self.hist.gradient.loadPreset(cmap)
         except: self.hist.gradient.loadPreset('thermal')
+        self.img_wf.setLookupTable(self.hist.gradient.getLookupTable(256, alpha=False))
+        opts = engine_options(self.settings)
+        if self.waterfall is None or self.waterfall.bins != opts['fft_size'] // 2 + 1: self._reset_waterfall(opts['fft_size'] // 2 + 1)
+        self.waterfall.set_levels(0, self.settings.get('drange', 60.0) + 20)
+        self.worker.configure(**opts)
         
         max_f = self.settings.get('max_freq', 3000)
         self.plot_spec.setXRange(0, max_f)
         self.plot_wf.setXRange(0, max_f)
         
-        new_idx = self.settings.get('audio_in_idx')
-        if self.monitor.device_index != new_idx:
-            self.monitor.stop(); self.monitor.device_index = new_idx; self.monitor.start()
+        self.scheduler.set_fps(self.settings.get('render_fps', DEFAULT_FPS))
+        self.monitor.set_device(self.settings.get('audio_in_idx'))
+        self.monitor.squelch.enabled = self.settings.get('squelch', True)
 
     def start(self): 
-        if not self.monitor.running: self.monitor.start()
+        self.monitor.start(self)
+        if not self.worker.isRunning(): self.worker.start()
+        self.scheduler.start()
     def stop(self): 
-        self.monitor.stop()
-    def update_data(self, chunk):
+        self.scheduler.stop(); self.worker.stop(); self.monitor.stop(self)
+    def update_data(self):
+        # Render tick: all spectra computed by the worker since the last paint are drawn at once
+        frames = self.worker.take()
+        if not frames: return False
         # Settings
         gain = self.settings.get('spec_gain', 1.0)
         ref = self.settings.get('ref_level', 0.0)
-        dr = self.settings.get('drange', 60.0)
         smooth = self.settings.get('wf_smooth', True)
         
         # Audio Level
-        rms = np.sqrt(np.mean(chunk**2))
-        db_audio = 20 * np.log10(rms + 1e-9)
-        level = np.clip((db_audio + 60) * 2, 0, 100)
+        level = np.clip((frames[-1][0] + 60) * 2, 0, 100)
         self.bar_rx.setValue(int(level))
         
-        # FFT
-        win = np.hanning(len(chunk))
-        fft_res = np.fft.rfft(chunk * win)
-        mag = np.abs(fft_res)
-        mag = 20 * np.log10(mag + 1e-9)
-        
-        # Apply Settings
-        mag = (mag + 50 + ref) * gain
-        
-        # Smoothing for waterfall visual (reduce noise)
-        if smooth:
-            # Simple moving average
-            mag = np.convolve(mag, np.ones(3)/3, mode='same')
-
-        freqs = np.fft.rfftfreq(len(chunk), 1.0/12000.0)
-        self.curve_spec.setData(freqs, mag)
+        # Waterfall rows (wf_speed picks them) + the newest spectrum for the curve, as one batch
+        bins = len(frames[-1][1])
+        if bins != self.waterfall.bins: self._reset_waterfall(bins)
+        rows = [mag for _, mag, is_row in frames if is_row and len(mag) == bins]
+        mags = self.display.load(rows + [frames[-1][1]])
         
-        # Waterfall Update
-        self.wf_data = np.roll(self.wf_data, -1, axis=0)
-        self.wf_data[-1] = mag[:513]
+        # Apply Settings + smoothing for waterfall visual (reduce noise), in place
+        self.display.apply(mags, 50 + ref, gain, smooth=smooth)
         
-        self.img_wf.setImage(self.wf_data.T, autoLevels=False, levels=(0, dr + 20))
-        self.img_wf.setRect(QRectF(0, 0, 6000, self.history_len))
+        if len(self._curve) < bins: self._curve = np.empty(bins, dtype=np.float32)
+        freqs, curve = visible_curve(bin_freqs(2 * (bins - 1), self.monitor.view_rate), mags[-1],
+                                     self.settings.get('max_freq', 3000), self.plot_spec.width(), out=self._curve)
+        self.curve_spec.setData(freqs, curve)
+        if rows:
+            with self._m_waterfall.time():
+                self.waterfall.push_rows(mags[:-1])
+                self.img_wf.setImage(self.waterfall.view(), autoLevels=False)
@@ -2,7 +2,11 @@ import numpy as np
 import pyqtgraph as pg
 from PyQt6.QtWidgets import QMainWindow, QFrame, QVBoxLayout
 from PyQt6.QtCore import Qt, QRectF
-from tng_packet.core.audio_stream import AudioMonitor
+from tng_packet.core.audio_stream import AudioMonitor, SpectrumWorker
+from tng_packet.core import metrics
+from tng_packet.core.waterfall import WaterfallBuffer
+from tng_packet.core.spectrum import engine_options, bin_freqs, DisplayScaler
+from tng_packet.ui.render_scheduler import RenderScheduler, visible_curve, DEFAULT_FPS
 
 class WidebandWindow(QMainWindow):
     def __init__(self, settings):
@@ -21,7 +25,6 @@ class WidebandWindow(QMainWindow):
         self.plot_spec = pg.PlotWidget()
         self.plot_spec.showAxis('bottom', False)
         self.plot_spec.showAxis('left', False)
-        self.plot_spec.setXRange(0, 6000)
         self.plot_spec.setYRange(0, 100)
         self.plot_spec.hideButtons()
         self.plot_spec.setMouseEnabled(x=False, y=False)
@@ -32,27 +35,39 @@ class WidebandWindow(QMainWindow):
         self.plot_wf = pg.PlotWidget()
         self.plot_wf.showAxis('bottom', False)
         self.plot_wf.showAxis('left', False)
-        self.plot_wf.setXRange(0, 6000)
         self.plot_wf.hideButtons()
         self.plot_wf.setMouseEnabled(x=False, y=False)
-        self.img_wf = pg.ImageItem()
+        self.img_wf = pg.ImageItem(axisOrder='row-major')
         self.plot_wf.addItem(self.img_wf)
         
+        # Gradient only (colormap -> LUT), not linked to the image
         self.hist = pg.HistogramLUTItem()
-        self.hist.setImageItem(self.img_wf)
         
         layout.addWidget(self.plot_wf, stretch=2)
 
         # Audio
-        self.monitor = AudioMonitor(self.settings.get('audio_in_idx'))
-        self.monitor.data_signal.connect(self.update_plots)
+        self.monitor = AudioMonitor.shared(self.settings.get('audio_in_idx'))
+        self.worker = SpectrumWorker(self.monitor, parent=self)
+        self.scheduler = RenderScheduler(self, self.update_plots, self.settings.get('render_fps', DEFAULT_FPS))
         
         self.history_len = 300
-        self.wf_data = np.zeros((self.history_len, 513))
+        self.waterfall = None
+        self.display = DisplayScaler()
+        self._m_waterfall = metrics.histogram('render.waterfall_ms')
+        self._curve = np.empty(0, dtype=np.float32)
         
         # Initialize
         self.refresh_settings()
 
+    def _reset_waterfall(self, bins):
+        self.waterfall = WaterfallBuffer(self.history_len, bins, levels=(0, 80))
+        self.img_wf.setImage(self.waterfall.view(), autoLevels=False)
+        # Whole decimated band: follows the capture rate (44.1 / 48 kHz)
+        self.max_freq = self.monitor.view_rate / 2
+        self.plot_spec.setXRange(0, self.max_freq)
+        self.plot_wf.setXRange(0, self.max_freq)
+        self.img_wf.setRect(QRectF(0, 0, self.max_freq, self.history_len))
+
     def refresh_settings(self):
         """Apply all settings immediately without restarting."""
         # 1. Colormap
@@ -62,6 +77,7 @@ class WidebandWindow(QMainWindow):
             self.hist.gradient.loadPreset(cmap_name)
         except KeyError:
             self.hist.gradient.loadPreset('thermal')
+        self.img_wf.setLookupTable(self.hist.gradient.getLookupTable(256, alpha=False))
             
         # 2. Theme (Colors)
         is_dark = (self.settings.get('theme', 'light') == 'dark')
@@ -73,36 +89,43 @@ class WidebandWindow(QMainWindow):
         else:
             self.curve_spec.setPen(pg.mkPen('b', width=1))
             
-        # 3. Audio Device (Restart if changed)
-        new_idx = self.settings.get('audio_in_idx')
-        if self.monitor.device_index != new_idx:
-            self.monitor.stop()
-            self.monitor.device_index = new_idx
-            if self.isVisible():
-                self.monitor.start()
+        # 3. Spectrum resolution / averaging / scroll speed (applied by the worker)
+        opts = engine_options(self.settings)
+        if self.waterfall is None or self.waterfall.bins != opts['fft_size'] // 2 + 1:
+            self._reset_waterfall(opts['fft_size'] // 2 + 1)
+        self.worker.configure(**opts)
+        self.scheduler.set_fps(self.settings.get('render_fps', DEFAULT_FPS))
+
+        # 4. Audio Device (shared stream restarts only if changed)
+        self.monitor.set_device(self.settings.get('audio_in_idx'))
 
     def showEvent(self, event):
         super().showEvent(event)
-        if not self.monitor.running: self.monitor.start()
+        self.monitor.start(self)
+        if not self.worker.isRunning(): self.worker.start()
+        self.scheduler.start()
 
     def closeEvent(self, event):
-        self.monitor.stop()
+        self.scheduler.stop()
+        self.worker.stop()
+        self.monitor.stop(self)
         super().closeEvent(event)
 
-    def update_plots(self, chunk):
+    def update_plots(self):
+        frames = self.worker.take()
+        if not frames: return False
         gain = self.settings.get('spec_gain', 1.0)
         
-        win = np.hanning(len(chunk))
-        fft_res = np.fft.rfft(chunk * win)
-        mag = np.abs(fft_res)
-        mag = 20 * np.log10(mag + 1e-9)
-        mag = np.clip(mag + 50, 0, 100) * gain
-        
-        freqs = np.fft.rfftfreq(len(chunk), 1.0/12000.0)
-        self.curve_spec.setData(freqs, mag)
-        
-        self.wf_data = np.roll(self.wf_data, -1, axis=0)
-        self.wf_data[-1] = mag[:513]
+        bins = len(frames[-1][1])
+        if bins != self.waterfall.bins: self._reset_waterfall(bins)
+        rows = [mag for _, mag, is_row in frames if is_row and len(mag) == bins]
+        mags = self.display.apply(self.display.load(rows + [frames[-1][1]]), 50, gain, clip=(0, 100))
         
-        self.img_wf.setImage(self.wf_data.T, autoLevels=False, levels=(0, 80))
-        self.img_wf.setRect(QRectF(0, 0, 6000, self.history_len))
+        if len(self._curve) < bins: self._curve = np.empty(bins, dtype=np.float32)
+        freqs, curve = visible_curve(bin_freqs(2 * (bins - 1), self.monitor.view_rate), mags[-1],
+                                     self.max_freq, self.plot_spec.width(), out=self._curve)
+        self.curve_spec.setData(freqs, curve)
+        if rows:
+            with self._m_waterfall.time():
+                self.waterfall.push_rows(mags[:-1])
+                self.img_wf.setImage(self.waterfall.view(), autoLevels=False)